@@ -1,42 +1,156 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.urls import path, reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
+
+from . import export, ratings, search
 from .models import Event, PressRelease, Video, ContactMessage, Comment
 
+
+class SearchIndexAdminMixin:
+    """
+    Answer changelist searches from the full-text index (core.search)
+    instead of icontains scans over every search_fields column.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search.matching_ids(self.search_kind, search_term)
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+
+
+class ExportAdminMixin:
+    """
+    Admin actions that download the selected rows as CSV or XLSX.
+
+    With "select all" the action gets the changelist queryset, so the
+    export follows the current filters, date drill-down and search. The
+    file is streamed as rows are read, whatever its size.
+    """
+    actions = ('export_csv', 'export_xlsx')
+
+    @admin.action(description='নির্বাচিতগুলো CSV হিসেবে ডাউনলোড করুন', permissions=('view',))
+    def export_csv(self, request, queryset):
+        return export.streaming_response(queryset, 'csv')
+
+    @admin.action(description='নির্বাচিতগুলো Excel (XLSX) হিসেবে ডাউনলোড করুন', permissions=('view',))
+    def export_xlsx(self, request, queryset):
+        return export.streaming_response(queryset, 'xlsx')
+
+
+class TriageAdminMixin:
+    """
+    Bulk read/unread actions that run as a single UPDATE.
+
+    ``list_editable`` saves each row through a full model save; these
+    actions never load the rows at all. Besides the actions (which with
+    "select all" cover every page of the filtered changelist) the
+    changelist gets a "mark all as read" button that applies to whatever
+    the current filters, date drill-down and search match.
+    """
+    change_list_template = 'admin/core/triage_change_list.html'
+
+    def _triage_message(self, request, count, state):
+        opts = self.model._meta
+        self.message_user(request, f'{count}টি {opts.verbose_name} {state} হিসেবে চিহ্নিত করা হয়েছে', messages.SUCCESS)
+
+    @admin.action(description='পড়া হয়েছে হিসেবে চিহ্নিত করুন', permissions=('change',))
+    def mark_read(self, request, queryset):
+        count = queryset.filter(is_read=False).order_by().update(is_read=True)
+        self._triage_message(request, count, 'পড়া')
+
+    @admin.action(description='পড়া হয়নি হিসেবে চিহ্নিত করুন', permissions=('change',))
+    def mark_unread(self, request, queryset):
+        count = queryset.filter(is_read=True).order_by().update(is_read=False)
+        self._triage_message(request, count, 'অপঠিত')
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                'mark-all-read/',
+                self.admin_site.admin_view(self.mark_all_read_view),
+                name=f'{opts.app_label}_{opts.model_name}_mark_all_read',
+            ),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'can_mark_all_read': self.has_change_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    @method_decorator(require_POST)
+    def mark_all_read_view(self, request):
+        """Mark every row matching the changelist's current query string as read"""
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        opts = self.model._meta
+        changelist_url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+        try:
+            queryset = self.get_changelist_instance(request).get_queryset(request)
+        except IncorrectLookupParameters:
+            return HttpResponseRedirect(changelist_url)
+        count = queryset.filter(is_read=False).order_by().update(is_read=True)
+        self._triage_message(request, count, 'পড়া')
+        query = request.GET.urlencode()
+        return HttpResponseRedirect(f'{changelist_url}?{query}' if query else changelist_url)
+
+
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'date', 'location')
-    search_fields = ('title', 'location')
+    search_fields = ('title', 'location', 'description')
+    search_kind = 'event'
     list_filter = ('date',)
     exclude = ('slug',)
 
 @admin.register(PressRelease)
-class PressReleaseAdmin(admin.ModelAdmin):
+class PressReleaseAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'date', 'category')
-    search_fields = ('title', 'category')
+    search_fields = ('title', 'category', 'summary', 'content')
+    search_kind = 'press'
     list_filter = ('date', 'category')
     exclude = ('slug',)
 
 @admin.register(Video)
-class VideoAdmin(admin.ModelAdmin):
+class VideoAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'created_at')
     search_fields = ('title',)
+    search_kind = 'video'
     list_filter = ('created_at',)
     exclude = ('slug',)
 
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(ExportAdminMixin, TriageAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'upazila', 'union', 'department', 'created_at', 'is_read')
     list_filter = ('upazila', 'union', 'department', 'is_read', 'created_at')
     search_fields = ('name', 'email', 'message')
     readonly_fields = ('created_at',)
     list_editable = ('is_read',)
     date_hierarchy = 'created_at'
+    actions = ('mark_read', 'mark_unread', 'export_csv', 'export_xlsx')
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ExportAdminMixin, TriageAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'upazila', 'union', 'category', 'rating', 'created_at', 'is_read', 'is_published')
     list_filter = ('upazila', 'union', 'category', 'rating', 'is_read', 'is_published', 'created_at')
     search_fields = ('name', 'email', 'subject', 'message')
     readonly_fields = ('created_at',)
     list_editable = ('is_read', 'is_published')
     date_hierarchy = 'created_at'
+    actions = ('mark_read', 'mark_unread', 'publish', 'unpublish', 'export_csv', 'export_xlsx')
+
+    @admin.action(description='প্রকাশ করুন', permissions=('change',))
+    def publish(self, request, queryset):
+        count = ratings.set_published(queryset, True)
+        self._triage_message(request, count, 'প্রকাশিত')
+
+    @admin.action(description='অপ্রকাশিত করুন', permissions=('change',))
+    def unpublish(self, request, queryset):
+        count = ratings.set_published(queryset, False)
+        self._triage_message(request, count, 'অপ্রকাশিত')
 
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .db_hooks import install
+
+        connection_created.connect(install, dispatch_uid='core.db_hooks')
+
+        if settings.METRICS_ENABLED:
+            from .metrics import instrument_templates
+            instrument_templates()
@@ -0,0 +1,359 @@
+"""
+Benchmarks for the public pages and the form endpoints.
+
+``manage.py seed_benchmark_data`` fills the database with realistic
+volumes of content and submissions. ``manage.py benchmark`` then sends
+each endpoint from endpoints() a fixed number of requests from a pool of
+threads. For each endpoint it reports p50/p95/p99 latency, throughput,
+the error count and the mean number of SQL queries per request.
+
+Two runners:
+
+- in-process (default): requests go through Django's test client, so the
+  whole middleware and view stack runs without a network hop. Queries are
+  counted with a connection execute wrapper. If a form has a captcha
+  field, the POST endpoint answers it from CaptchaStore, with the
+  challenges created before timing starts.
+- HTTP (``--url``): plain urllib requests against a running server, e.g.
+  the gunicorn container, to size workers and threads. Only GET endpoints
+  run (the forms need CSRF and a captcha); queries are not counted.
+
+With ``--slow-clients N`` the HTTP runner also keeps N connections open
+that send their request headers a line at a time and never finish, the
+way a slow mobile client ties up a server. A gunicorn gthread worker
+reads request headers in a worker thread, so each of those connections
+holds a thread; uvicorn workers read them on the event loop.
+``--server-pid`` reports the resident memory of the server's master and
+worker processes after each endpoint, so WSGI and ASGI deployments can
+be compared at equal memory.
+
+Results can be saved as a baseline JSON file and later runs compared
+against it: more queries per request, p95 latency above the baseline by
+more than the tolerance, or throughput below it by more than the
+tolerance, counts as a regression.
+"""
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from captcha.fields import CaptchaField
+from captcha.models import CaptchaStore
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from .forms import CommentForm, ContactForm
+from .models import ContactMessage, Event, PressRelease, Video
+
+SEED_TAG = '[bench]'
+SEED_EMAIL_DOMAIN = 'bench.invalid'
+
+# Detail pages are spread over this many of the newest objects.
+DETAIL_SAMPLE = 50
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    paths: list
+    expected: tuple = (200,)
+    # POST endpoints: kind of form data to build (see form_data())
+    form: str = ''
+    payloads: list = field(default_factory=list)
+
+    def path(self, i):
+        return self.paths[i % len(self.paths)]
+
+
+def _detail_paths(model, prefix):
+    slugs = model.objects.order_by('-pk').values_list('slug', flat=True)[:DETAIL_SAMPLE]
+    return [f'{prefix}{slug}/' for slug in slugs]
+
+
+def endpoints():
+    """The benchmarked endpoints, with detail paths taken from the database"""
+    result = [
+        Endpoint('home', 'GET', ['/']),
+        Endpoint('events', 'GET', ['/events/']),
+        Endpoint('event_detail', 'GET', _detail_paths(Event, '/events/')),
+        Endpoint('press_releases', 'GET', ['/press/']),
+        Endpoint('press_release_detail', 'GET', _detail_paths(PressRelease, '/press/')),
+        Endpoint('videos', 'GET', ['/videos/']),
+        Endpoint('video_detail', 'GET', _detail_paths(Video, '/videos/')),
+        Endpoint('comment_feed', 'GET', ['/comments/published/']),
+        Endpoint('search', 'GET', ['/search/?q=সমাবেশ', '/search/?q=উন্নয়ন', '/search/?q=campaign']),
+        Endpoint('sitemap', 'GET', ['/sitemap.xml']),
+        Endpoint('contact_post', 'POST', ['/contact/'], expected=(302,), form='contact'),
+        Endpoint('comments_post', 'POST', ['/comments/'], expected=(302,), form='comment'),
+    ]
+    return [endpoint for endpoint in result if endpoint.paths]
+
+
+def form_data(kind, i):
+    """Valid form data for submission number ``i`` (captcha fields excluded)"""
+    upazila, unions = list(ContactMessage.UPAZILA_UNION_MAP.items())[i % 2]
+    data = {
+        'name': f'Benchmark {i}',
+        'email': f'user{i}@{SEED_EMAIL_DOMAIN}',
+        'upazila': upazila,
+        'union': unions[i % len(unions)],
+        'message': 'বেঞ্চমার্ক বার্তা। ' * 5,
+    }
+    if kind == 'contact':
+        data.update(phone='01700000000', department='general')
+    else:
+        data.update(subject='বেঞ্চমার্ক', category='general', rating=str(i % 5 + 1))
+    return data
+
+
+FORMS = {
+    'contact': ContactForm,
+    'comment': CommentForm,
+}
+
+
+def solved_captchas(kind):
+    """Answers for the captcha fields of a form, if it has any"""
+    data = {}
+    for name, form_field in FORMS[kind].base_fields.items():
+        if isinstance(form_field, CaptchaField):
+            hashkey = CaptchaStore.generate_key()
+            response = CaptchaStore.objects.values_list('response', flat=True).get(hashkey=hashkey)
+            data.update({f'{name}_0': hashkey, f'{name}_1': response})
+    return data
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+class InProcessRunner:
+    name = 'in-process'
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def prepare(self, endpoint, requests):
+        if endpoint.form:
+            endpoint.payloads = [
+                {**form_data(endpoint.form, i), **solved_captchas(endpoint.form)} for i in range(requests)
+            ]
+
+    def request(self, endpoint, i):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            if endpoint.method == 'POST':
+                response = client.post(endpoint.path(i), endpoint.payloads[i])
+            else:
+                response = client.get(endpoint.path(i))
+            elapsed = time.perf_counter() - start
+        return response.status_code, elapsed, queries
+
+    def finish_thread(self):
+        connections.close_all()
+
+    def settings(self):
+        # The test client's host, and no rate limiting of the form endpoints.
+        return override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            RATELIMIT_ENABLED=False,
+        )
+
+
+class HttpRunner:
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30, server_pid=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.server_pid = server_pid
+
+    def prepare(self, endpoint, requests):
+        pass
+
+    def request(self, endpoint, i):
+        url = self.base_url + urllib.request.quote(endpoint.path(i), safe='/?=&')
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, TimeoutError):
+            status = 0
+        return status, time.perf_counter() - start, None
+
+    def finish_thread(self):
+        pass
+
+    def settings(self):
+        return override_settings()
+
+    def memory(self):
+        return server_rss_mb(self.server_pid) if self.server_pid else None
+
+
+def server_rss_mb(pid):
+    """Resident memory of a process and its children (e.g. gunicorn workers), in MB"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status', encoding='ascii') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children', encoding='ascii') as f:
+                    pending += [int(child) for child in f.read().split()]
+        except (FileNotFoundError, ProcessLookupError, StopIteration):
+            continue
+    return round(total / 1024, 1)
+
+
+class SlowClients:
+    """Hold ``count`` connections open, each trickling an unfinished request."""
+
+    def __init__(self, base_url, count, interval=1.0):
+        url = urllib.parse.urlsplit(base_url)
+        self.address = (url.hostname, url.port or 80)
+        self.host = url.netloc
+        self.count = count
+        self.interval = interval
+        self.done = threading.Event()
+        self.threads = []
+
+    def _trickle(self):
+        try:
+            with socket.create_connection(self.address, timeout=self.interval * 10) as sock:
+                sock.sendall(f'GET / HTTP/1.1\r\nHost: {self.host}\r\n'.encode())
+                while not self.done.wait(self.interval):
+                    sock.sendall(b'X-Slow: 1\r\n')
+        except OSError:
+            pass
+
+    def __enter__(self):
+        for _ in range(self.count):
+            thread = threading.Thread(target=self._trickle, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        # Let the server accept them before the measured requests start.
+        time.sleep(self.interval)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def run_endpoint(runner, endpoint, requests, concurrency):
+    """Send ``requests`` requests to one endpoint and summarise the timings"""
+    runner.prepare(endpoint, requests)
+    results = [None] * requests
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                results[i] = runner.request(endpoint, i)
+        finally:
+            runner.finish_thread()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed * 1000 for _, elapsed, _ in results)
+    queries = [count for _, _, count in results if count is not None]
+    result = {
+        'requests': requests,
+        'errors': sum(status not in endpoint.expected for status, _, _ in results),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'rps': round(requests / wall, 1),
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+    memory = getattr(runner, 'memory', None)
+    if memory is not None and memory() is not None:
+        result['rss_mb'] = memory()
+    return result
+
+
+def run(runner, selected=None, requests=200, concurrency=4, warmup=5, slow_clients=0):
+    """Benchmark every (or every ``selected``) endpoint; returns ``{name: result}``"""
+    results = {}
+    with runner.settings(), ExitStack() as stack:
+        if slow_clients:
+            stack.enter_context(SlowClients(runner.base_url, slow_clients))
+        for endpoint in endpoints():
+            if selected and endpoint.name not in selected:
+                continue
+            if endpoint.method == 'POST' and isinstance(runner, HttpRunner):
+                continue
+            if warmup and endpoint.method == 'GET':
+                run_endpoint(runner, endpoint, warmup, 1)
+            results[endpoint.name] = run_endpoint(runner, endpoint, requests, concurrency)
+    return results
+
+
+def compare(results, baseline, tolerance=0.5):
+    """Return a list of regressions of ``results`` against ``baseline``"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result['errors'] > before.get('errors', 0):
+            regressions.append(f'{name}: {result["errors"]} error(s), baseline {before.get("errors", 0)}')
+        if result['queries'] is not None and before.get('queries') is not None:
+            if result['queries'] > before['queries']:
+                regressions.append(f'{name}: {result["queries"]} queries/request, baseline {before["queries"]}')
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{name}: p95 {result["p95_ms"]} ms, baseline {before["p95_ms"]} ms')
+        if result['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: {result["rps"]} req/s, baseline {before["rps"]} req/s')
+    return regressions
+
+
+def save_baseline(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
@@ -0,0 +1,138 @@
+"""
+Page cache for the public content views.
+
+Rendered pages are stored in the default cache, keyed by URL, active
+language and whether the visitor is signed in. Every key also embeds the
+current version token of each content model the page depends on. The
+post_save/post_delete receivers in core/signals.py bump those tokens once
+the save commits, so saving an Event retires only the pages that list
+events and leaves the rest of the cache warm.
+
+Templates also cache fragments with ``{% cache %}``: content cards are
+keyed by pk, ``updated_at`` and site_version(), the navbar and footer by
+site_version() alone (exposed to templates as ``site_version``).
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+VERSION_KEY_PREFIX = 'content-version'
+PAGE_KEY_PREFIX = 'page'
+SITE_VERSION_KEY = f'{VERSION_KEY_PREFIX}:site'
+
+
+def _version_key(model):
+    return f'{VERSION_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def content_versions(*models):
+    """
+    Return the current version token of each model, in the given order.
+
+    Missing tokens (first use, or evicted from the cache) are initialised to
+    the current time rather than a counter, so a re-created token can never
+    collide with one that pages were cached under before.
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_content_version(model):
+    """Invalidate every cached page that depends on ``model``."""
+    cache.set(_version_key(model), time.time_ns(), timeout=None)
+
+
+def site_version():
+    """
+    Return the site-wide version token.
+
+    It keys everything rendered from templates that no content model
+    invalidates (the navbar/footer fragments and, on top of the model
+    versions, whole pages). ``manage.py bump_site_version`` moves it on
+    every deploy so new templates never meet old cached HTML.
+    """
+    version = cache.get(SITE_VERSION_KEY)
+    if version is None:
+        cache.add(SITE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(SITE_VERSION_KEY)
+    return version
+
+
+def bump_site_version():
+    version = time.time_ns()
+    cache.set(SITE_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def page_cache_key(request, models):
+    """Build the cache key for ``request`` rendered against ``models``."""
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    versions = '.'.join(str(v) for v in [site_version(), *content_versions(*models)])
+    audience = 'auth' if request.user.is_authenticated else 'anon'
+    return f'{PAGE_KEY_PREFIX}:{url}:{get_language()}:{audience}:{versions}'
+
+
+def _lookup(request, models):
+    key = page_cache_key(request, models)
+    return key, cache.get(key)
+
+
+def _store(request, key, response, timeout):
+    if request.method == 'GET' and response.status_code == 200 and not response.cookies:
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+
+
+def cache_page_for(*models, timeout=None):
+    """
+    Cache a view's GET responses until any of ``models`` changes.
+
+    Only successful responses that don't set cookies are stored, so pages
+    carrying a fresh CSRF token or a flashed message are never shared.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or not settings.PAGE_CACHE_ENABLED:
+                    return await view_func(request, *args, **kwargs)
+
+                # The key reads request.user (a session lookup) and the cache
+                # client blocks, so both run in a worker thread.
+                key, response = await sync_to_async(_lookup)(request, models)
+                if response is not None:
+                    response['X-Page-Cache'] = 'hit'
+                    return response
+
+                response = await view_func(request, *args, **kwargs)
+                await sync_to_async(_store)(request, key, response, timeout)
+                response['X-Page-Cache'] = 'miss'
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not settings.PAGE_CACHE_ENABLED:
+                return view_func(request, *args, **kwargs)
+
+            key, response = _lookup(request, models)
+            if response is not None:
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            _store(request, key, response, timeout)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
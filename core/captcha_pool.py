@@ -0,0 +1,144 @@
+"""
+Pre-rendered pool of django-simple-captcha challenges.
+
+Rendering a captcha image with Pillow is the most expensive thing an
+anonymous visitor can trigger, and bots trigger it the most. Challenges
+are instead created and drawn ahead of time by ``manage.py
+refill_captcha_pool`` and parked in the default cache:
+
+    captcha-pool:slot:<n>     -> hashkey, a FIFO queue of ready challenges
+    captcha-pool:head / tail  -> counters; pick() INCRs head, refill moves tail
+    captcha-pool:image:<key>  -> (content type, rendered image bytes)
+    captcha-pool:batches      -> [(first n, last n, slot expiry)] for depth()
+
+Handing one out is a single INCR plus a GET, with no database
+access. The counters and the batch list never expire, so Redis must run
+with a ``volatile-*`` eviction policy that leaves them alone; if head is
+lost anyway, it is re-seeded from the first live batch rather than from
+0, so pick() never walks through expired slots. Slots expire
+CAPTCHA_POOL_MIN_LIFETIME minutes before their CaptchaStore row, so every
+challenge handed out stays valid for at least that long. When the pool is empty (or the cache is per process) pick()
+falls back to creating a challenge inline, exactly as the library would.
+"""
+
+import datetime
+import logging
+import secrets
+import time
+
+from captcha import views as captcha_views
+from captcha.conf import settings as captcha_settings
+from captcha.models import CaptchaStore
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+POOL_KEY = 'captcha-pool'
+
+# Expired slots skipped per pick() before giving up and generating inline.
+PICK_ATTEMPTS = 5
+
+
+def _key(*parts):
+    return ':'.join((POOL_KEY,) + tuple(str(part) for part in parts))
+
+
+def _slot_timeout():
+    return (captcha_settings.CAPTCHA_TIMEOUT - settings.CAPTCHA_POOL_MIN_LIFETIME) * 60
+
+
+def _seed_head():
+    """Create the head counter just before the oldest challenge still live"""
+    firsts = [first for first, _, _ in _live_batches()]
+    start = min(firsts) - 1 if firsts else cache.get(_key('tail')) or 0
+    cache.add(_key('head'), start, timeout=None)
+
+
+def _next_slot():
+    try:
+        return cache.incr(_key('head'))
+    except ValueError:
+        _seed_head()
+        return cache.incr(_key('head'))
+
+
+def pick():
+    """Return the hashkey of a ready challenge, generating one if none is left"""
+    for _ in range(PICK_ATTEMPTS):
+        try:
+            n = _next_slot()
+        except ValueError:
+            break
+        hashkey = cache.get(_key('slot', n))
+        if hashkey:
+            cache.delete(_key('slot', n))
+            return hashkey
+        if n > (cache.get(_key('tail')) or 0):
+            break
+    logger.info('Captcha pool empty, generating a challenge inline')
+    return CaptchaStore.generate_key()
+
+
+def image(hashkey):
+    """Return ``(content_type, bytes)`` for a pooled challenge, or None"""
+    return cache.get(_key('image', hashkey))
+
+
+def _live_batches(now=None):
+    now = now or time.time()
+    return [batch for batch in cache.get(_key('batches'), []) if batch[2] > now]
+
+
+def depth():
+    """Number of unexpired challenges waiting in the pool"""
+    head = cache.get(_key('head')) or 0
+    return sum(max(last - max(first, head + 1) + 1, 0) for first, last, _ in _live_batches())
+
+
+def refill(size, batch_size=100):
+    """
+    Top the pool up to ``size`` challenges, ``batch_size`` at a time.
+
+    Must only run in one process at a time, since it owns the tail counter.
+    Returns the number of challenges added.
+    """
+    added = 0
+    while (missing := size - depth()) > 0:
+        added += _push(min(missing, batch_size))
+    return added
+
+
+def _push(count):
+    expiration = timezone.now() + datetime.timedelta(minutes=captcha_settings.CAPTCHA_TIMEOUT)
+    stores = []
+    for _ in range(count):
+        challenge, response = captcha_settings.get_challenge()()
+        stores.append(CaptchaStore(
+            challenge=challenge,
+            response=response.lower(),
+            hashkey=secrets.token_hex(20),
+            expiration=expiration,
+        ))
+    CaptchaStore.objects.bulk_create(stores)
+
+    # Consumers that ran the queue dry pushed head past tail; start after it.
+    _seed_head()
+    first = max(cache.get(_key('tail')) or 0, cache.get(_key('head')) or 0) + 1
+    images = {}
+    slots = {}
+    for n, store in enumerate(stores, start=first):
+        response = captcha_views.captcha_image(None, store.hashkey)
+        images[_key('image', store.hashkey)] = (response['Content-Type'], response.content)
+        slots[_key('slot', n)] = store.hashkey
+    last = first + len(stores) - 1
+
+    slot_timeout = _slot_timeout()
+    cache.set_many(images, timeout=captcha_settings.CAPTCHA_TIMEOUT * 60)
+    cache.set_many(slots, timeout=slot_timeout)
+    # Publish the slots only once they are all in place.
+    cache.set(_key('tail'), last, timeout=None)
+    batches = _live_batches() + [(first, last, time.time() + slot_timeout)]
+    cache.set(_key('batches'), batches, timeout=None)
+    return len(stores)
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cache import site_version as get_site_version
+
+
+def site_version(request):
+    """Expose the site-wide cache version, fetched only if a template uses it"""
+    return {'site_version': SimpleLazyObject(get_site_version)}
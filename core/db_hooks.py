@@ -0,0 +1,50 @@
+"""
+Per-request query hooks that also see the queries of async views.
+
+``connection.execute_wrapper()`` only applies to the current thread's
+connection. Under ASGI the ORM calls of an async view run in a
+sync_to_async thread with a connection of its own, so a wrapper that a
+middleware installs on the event loop thread would never see them.
+
+Instead, every connection gets one dispatcher when it opens (the
+``connection_created`` receiver is connected in CoreConfig.ready). The
+dispatcher runs the hooks that ``query_hook()`` registered in the current
+context. Context variables follow a request into its sync_to_async
+threads, so this works the same under WSGI and ASGI.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connections
+
+_hooks = ContextVar('query_hooks', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    hooks = _hooks.get()
+    for hook in reversed(hooks):
+        execute = partial(hook, execute)
+    return execute(sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Add the dispatcher to ``connection`` (a ``connection_created`` receiver)"""
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def query_hook(hook):
+    """
+    Call ``hook(execute, sql, params, many, context)`` for every query run
+    in this context, like an execute wrapper on every connection.
+    """
+    for connection in connections.all(initialized_only=True):
+        install(connection=connection)
+    token = _hooks.set((*_hooks.get(), hook))
+    try:
+        yield
+    finally:
+        _hooks.reset(token)
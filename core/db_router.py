@@ -0,0 +1,181 @@
+"""
+Read-replica routing for the public pages.
+
+Replicas are only used where it is known to be safe: inside views wrapped
+in ``@use_replica`` (the public listing, detail, search and sitemap views)
+or an explicit ``with replica_reads():`` block. Everything else
+(admin, forms, sessions, management commands) reads the primary, so
+nothing outside those views has to think about replication lag.
+
+Inside a replica scope the primary is still used when:
+
+- the visitor wrote something in the last REPLICA_STICKY_SECONDS (the
+  ``ReplicaStickinessMiddleware`` cookie), so an editor always sees their
+  own saves; or
+- public content (events, press releases, videos, published comments)
+  changed in that window, whoever changed it. Page, fragment
+  and sitemap caches are invalidated on save, and the first render after
+  that must not repopulate them from a replica that hasn't caught up.
+
+Both are decided once when the scope is entered (one cache GET per
+request), so the router itself only reads context variables.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .middleware import HybridMiddleware
+
+PIN_COOKIE = 'primary_db'
+RECENT_WRITE_KEY = 'replica:recent-content-write'
+
+# Writes to these models make every replica read fall back to the primary
+# for a while (see the module docstring).
+CONTENT_MODELS = {'core.event', 'core.pressrelease', 'core.video', 'core.searchdocument'}
+
+_replica_allowed = ContextVar('replica_allowed', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS
+
+
+def _may_use_replica():
+    """Whether replicas exist and this visitor isn't pinned to the primary"""
+    return bool(replica_aliases()) and not _pinned.get()
+
+
+@contextmanager
+def replica_reads(safe=None):
+    """
+    Allow the queries in this block to be served by a replica.
+
+    ``safe`` is whether no public content was written recently; it is
+    looked up in the cache when not given.
+    """
+    if safe is None:
+        safe = _may_use_replica() and not _recent_content_write()
+    token = _replica_allowed.set(safe)
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+def use_replica(view_func):
+    """Serve a read-only view's queries from a replica when that is safe."""
+    if iscoroutinefunction(view_func):
+        # The context variable follows the view's ORM calls into their
+        # sync_to_async threads.
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_func(request, *args, **kwargs)
+            safe = _may_use_replica() and not await sync_to_async(_recent_content_write)()
+            with replica_reads(safe):
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def _recent_content_write():
+    return cache.get(RECENT_WRITE_KEY) is not None
+
+
+def _mark_content_write():
+    cache.set(RECENT_WRITE_KEY, 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def note_content_write():
+    """
+    Keep replica reads on the primary while a public-facing change replicates.
+
+    The flag is set at once and, inside a transaction, again on commit, so the
+    window covers the transaction and starts counting only once replicas can
+    see the change.
+    """
+    if replica_aliases():
+        _mark_content_write()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(_mark_content_write)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or not _replica_allowed.get() or _pinned.get():
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not replica_aliases():
+            return 'default'
+        _wrote.set(True)
+        if model._meta.label_lower in CONTENT_MODELS:
+            note_content_write()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+class ReplicaStickinessMiddleware(HybridMiddleware):
+    """
+    Pin a visitor to the primary for a while after they wrote anything.
+
+    The pin is a short-lived signed cookie, so it follows the visitor
+    across gunicorn workers without any shared state.
+    """
+
+    def handle(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+        with self.pinning(request):
+            return self.pin_writers(request, self.get_response(request))
+
+    async def ahandle(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        with self.pinning(request):
+            return self.pin_writers(request, await self.get_response(request))
+
+    @contextmanager
+    def pinning(self, request):
+        pinned = request.get_signed_cookie(
+            PIN_COOKIE, default=None, max_age=settings.REPLICA_STICKY_SECONDS,
+        ) is not None
+        pinned_token = _pinned.set(pinned)
+        wrote_token = _wrote.set(False)
+        try:
+            yield
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+
+    def pin_writers(self, request, response):
+        if _wrote.get():
+            response.set_signed_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,34 @@
+"""
+Connection reuse statistics for the current worker process.
+
+Persistent connections and psycopg pools both live inside one gunicorn
+worker, so these numbers describe only the process that answers the
+request (its ``pid`` is included).
+"""
+
+import os
+
+from django.db import connections
+
+
+def connection_stats(alias='default'):
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, 'pool', None)
+    if pool is not None:
+        mode = 'pool'
+    elif settings_dict['CONN_MAX_AGE']:
+        mode = 'persistent'
+    else:
+        mode = 'per-request'
+    return {
+        'alias': alias,
+        'pid': os.getpid(),
+        'vendor': connection.vendor,
+        'mode': mode,
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        # This thread's connection; other threads hold their own.
+        'connected': connection.connection is not None,
+        'pool': pool.get_stats() if pool is not None else None,
+    }
@@ -1,6 +1,30 @@
+from captcha.fields import CaptchaField, CaptchaTextInput
 from django import forms
+from . import captcha_pool
 from .models import ContactMessage, Comment
 
+
+class PooledCaptchaTextInput(CaptchaTextInput):
+    """Captcha widget that takes a pre-rendered challenge from the pool"""
+
+    def fetch_captcha_store(self, name, value, attrs=None, generator=None):
+        self._key = captcha_pool.pick()
+        self._value = [self._key, '']
+        self.id_ = self.build_attrs(attrs).get('id', None)
+
+
+def pooled_captcha_field():
+    """A CaptchaField for a form that opts in, drawing its challenge from the pool"""
+    return CaptchaField(
+        label='নিরাপত্তা কোড',
+        widget=PooledCaptchaTextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'ছবির অক্ষরগুলো লিখুন',
+            'autocomplete': 'off',
+        }),
+    )
+
+
 class ContactForm(forms.ModelForm):
     
     class Meta:
@@ -0,0 +1,138 @@
+"""
+Responsive image derivatives for uploaded photos.
+
+When an Event/PressRelease image or a Video thumbnail is uploaded, resized
+copies are written next to the original, one per width and format::
+
+    events/rally.jpg  ->  events/rally-400w.avif, events/rally-400w.webp,
+                          events/rally-400w.jpg, events/rally-800w.avif, ...
+
+The widths that were generated are stored on the model, so templates can
+build ``srcset`` attributes without touching the storage backend.
+"""
+
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (400, 800, 1200)
+
+# (format, Pillow encoder, extension, MIME type, save options), best first.
+VARIANT_FORMATS = [
+    spec
+    for spec in (
+        ('avif', 'AVIF', 'avif', 'image/avif', {'quality': 55}),
+        ('webp', 'WEBP', 'webp', 'image/webp', {'quality': 75, 'method': 4}),
+        ('jpeg', 'JPEG', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+    )
+    if spec[0] == 'jpeg' or features.check(spec[0])
+]
+
+
+def variant_name(name, width, ext):
+    root, _ = os.path.splitext(name)
+    return f'{root}-{width}w.{ext}'
+
+
+def build_variants(fieldfile):
+    """
+    Write every derivative of ``fieldfile`` and return the widths produced.
+
+    Widths above the original's width are capped at it, so a small image
+    still gets compressed formats at its own size while a large one never
+    gets a variant wider than the largest VARIANT_WIDTHS entry. Unreadable
+    images are logged and produce no variants, so a bad upload never blocks
+    a save.
+    """
+    storage = fieldfile.storage
+    try:
+        with fieldfile.open('rb'):
+            image = ImageOps.exif_transpose(Image.open(fieldfile))
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        logger.warning('Could not read %s for image variants', fieldfile.name, exc_info=True)
+        return []
+
+    widths = sorted({min(width, image.width) for width in VARIANT_WIDTHS})
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for _, encoder, ext, _, options in VARIANT_FORMATS:
+            frame = resized
+            if encoder == 'JPEG' and frame.mode not in ('RGB', 'L'):
+                frame = frame.convert('RGB')
+            elif frame.mode not in ('RGB', 'RGBA', 'L'):
+                frame = frame.convert('RGBA')
+            out = BytesIO()
+            frame.save(out, encoder, **options)
+            name = variant_name(fieldfile.name, width, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(out.getvalue()))
+    return widths
+
+
+def delete_variants(storage, name, widths, keep=()):
+    """Remove the derivatives of ``name`` except those named in ``keep``"""
+    for width in widths:
+        for _, _, ext, _, _ in VARIANT_FORMATS:
+            variant = variant_name(name, width, ext)
+            if variant not in keep:
+                storage.delete(variant)
+
+
+def refresh_variants(instance, field_name, widths_field):
+    """
+    Regenerate derivatives when ``instance`` carries a new upload.
+
+    Called from ``save()`` before the row is written. The upload is committed
+    to storage first (which FileField.pre_save would otherwise do) so the
+    variants are named after the final stored file. The previous upload's
+    variants are deleted when the image is replaced or cleared.
+    """
+    fieldfile = getattr(instance, field_name)
+    if fieldfile and fieldfile._committed:
+        return
+    if not fieldfile and not getattr(instance, widths_field):
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = type(instance).objects.filter(pk=instance.pk).values_list(field_name, widths_field).first()
+
+    widths = []
+    if fieldfile:
+        fieldfile.save(fieldfile.name, fieldfile.file, save=False)
+        widths = build_variants(fieldfile)
+    setattr(instance, widths_field, widths)
+
+    if previous and previous[0] and previous[1]:
+        old_name, old_widths = previous
+        keep = set()
+        if fieldfile:
+            keep = {variant_name(fieldfile.name, width, spec[2]) for width in widths for spec in VARIANT_FORMATS}
+        delete_variants(fieldfile.storage, old_name, old_widths, keep)
+
+
+def picture_sources(fieldfile, widths):
+    """
+    Return ``[{'type': ..., 'srcset': ...}]`` for a ``<picture>`` element.
+
+    The JPEG entry doubles as the ``<img srcset>`` fallback, and the
+    original upload stays the plain ``src`` for browsers without srcset.
+    """
+    if not fieldfile or not widths:
+        return []
+    storage = fieldfile.storage
+    sources = []
+    for _, _, ext, mime, _ in VARIANT_FORMATS:
+        candidates = [
+            f'{storage.url(variant_name(fieldfile.name, width, ext))} {width}w'
+            for width in widths
+        ]
+        sources.append({'type': mime, 'srcset': ', '.join(candidates)})
+    return sources
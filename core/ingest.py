@@ -0,0 +1,198 @@
+"""
+Spooled ingestion of contact messages and comments.
+
+With ``SUBMISSION_INGEST_MODE = 'spool'`` the contact and comments views
+don't INSERT inside the request. The validated form data is written as one
+small JSON file to SUBMISSION_SPOOL_DIR/<kind>/, made durable with fsync
+and an atomic rename. ``manage.py flush_submissions`` then bulk-inserts the
+spool in batches::
+
+    spool/
+        contact/   1760000000000000000-<uuid>.json ...
+        comment/   ...
+        failed/    files that could not be loaded (kept for inspection)
+        stats.json last flush timings, read by queue_stats()
+
+If the database rejects a batch (a constraint or a value that doesn't
+fit), the rows are retried one by one and only the rejected ones are
+moved to failed/, so one bad submission never holds up the spool. Errors
+that aren't about the data (the database being down) leave the batch in
+place for the next flush.
+
+Delivery is at-least-once: a worker killed between COMMIT and deleting
+the files re-inserts that batch on restart. ``created_at`` is set when the
+row is inserted, normally a few seconds after submission.
+
+The default mode, 'sync', keeps the old ``form.save()`` behaviour.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, transaction
+
+from .models import Comment, ContactMessage
+
+logger = logging.getLogger(__name__)
+
+KINDS = {
+    'contact': ContactMessage,
+    'comment': Comment,
+}
+
+KIND_FOR_MODEL = {model: kind for kind, model in KINDS.items()}
+
+
+def _spool_dir(*parts):
+    return os.path.join(settings.SUBMISSION_SPOOL_DIR, *parts)
+
+
+def _write_durably(directory, filename, content):
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def submit(form):
+    """Persist a valid ModelForm now or spool it, depending on the ingest mode"""
+    if settings.SUBMISSION_INGEST_MODE == 'spool':
+        enqueue(form)
+    else:
+        form.save()
+
+
+def enqueue(form):
+    """Write a valid ModelForm's data to the spool for the flush worker"""
+    kind = KIND_FOR_MODEL[form._meta.model]
+    payload = {
+        'submitted_at': time.time(),
+        'data': {name: form.cleaned_data.get(name) for name in form._meta.fields},
+    }
+    # Nanosecond prefix keeps directory order equal to arrival order.
+    filename = f'{time.time_ns()}-{uuid.uuid4().hex}.json'
+    _write_durably(_spool_dir(kind), filename, json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def _pending(kind):
+    try:
+        names = os.listdir(_spool_dir(kind))
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith('.json'))
+
+
+def flush(kind, batch_size=500):
+    """
+    Bulk-insert up to ``batch_size`` spooled submissions of one kind.
+
+    Returns the number of rows inserted.
+    """
+    model = KINDS[kind]
+    objects = []
+    loaded = []
+    for name in _pending(kind)[:batch_size]:
+        path = _spool_dir(kind, name)
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+            objects.append(model(**payload['data']))
+        except FileNotFoundError:
+            continue
+        except (ValueError, TypeError, KeyError):
+            logger.exception('Moving unreadable %s submission %s aside', kind, name)
+            _move_aside(kind, path)
+            continue
+        loaded.append(path)
+
+    if not objects:
+        return 0
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=batch_size)
+    except (IntegrityError, DataError):
+        logger.warning('Batch of %d %s submission(s) rejected, inserting one by one', len(objects), kind)
+        return _insert_one_by_one(kind, model, objects, loaded)
+    for path in loaded:
+        os.remove(path)
+    return len(objects)
+
+
+def _move_aside(kind, path):
+    os.makedirs(_spool_dir('failed'), exist_ok=True)
+    os.replace(path, _spool_dir('failed', f'{kind}-{os.path.basename(path)}'))
+
+
+def _insert_one_by_one(kind, model, objects, paths):
+    inserted = 0
+    for obj, path in zip(objects, paths):
+        try:
+            with transaction.atomic():
+                obj.save(force_insert=True)
+        except (IntegrityError, DataError):
+            logger.exception('Moving rejected %s submission %s aside', kind, os.path.basename(path))
+            _move_aside(kind, path)
+            continue
+        os.remove(path)
+        inserted += 1
+    return inserted
+
+
+def flush_all(batch_size=500):
+    """Flush one batch of every kind, record timings and return row counts"""
+    started = time.monotonic()
+    counts = {kind: flush(kind, batch_size) for kind in KINDS}
+    elapsed = time.monotonic() - started
+    if any(counts.values()):
+        _record_flush(counts, elapsed)
+        logger.info('Flushed %s in %.3fs', counts, elapsed)
+    return counts
+
+
+def _record_flush(counts, elapsed):
+    path = _spool_dir('stats.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            stats = json.load(f)
+    except (FileNotFoundError, ValueError):
+        stats = {'flushes': 0, 'rows': {kind: 0 for kind in KINDS}}
+    stats['flushes'] += 1
+    for kind, count in counts.items():
+        stats['rows'][kind] = stats['rows'].get(kind, 0) + count
+    stats['last_flush_at'] = time.time()
+    stats['last_flush_seconds'] = elapsed
+    stats['last_flush_rows'] = counts
+    _write_durably(_spool_dir(), 'stats.json', json.dumps(stats))
+
+
+def queue_stats():
+    """
+    Return spool depth per kind, the age of the oldest pending submission,
+    the number of submissions moved to failed/ and the figures recorded by
+    the last flush.
+    """
+    now = time.time_ns()
+    stats = {'queues': {}}
+    for kind in KINDS:
+        pending = _pending(kind)
+        oldest = (now - int(pending[0].split('-', 1)[0])) / 1e9 if pending else 0.0
+        stats['queues'][kind] = {'depth': len(pending), 'oldest_seconds': oldest}
+    try:
+        stats['failed'] = sum(name.endswith('.json') for name in os.listdir(_spool_dir('failed')))
+    except FileNotFoundError:
+        stats['failed'] = 0
+    try:
+        with open(_spool_dir('stats.json'), encoding='utf-8') as f:
+            stats['flush'] = json.load(f)
+    except (FileNotFoundError, ValueError):
+        stats['flush'] = None
+    return stats
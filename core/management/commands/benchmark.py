@@ -0,0 +1,83 @@
+import datetime
+import os
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Load-test the public pages and form endpoints and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4, help='Client threads')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per GET endpoint first')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run this endpoint (repeatable)')
+        parser.add_argument('--url', help='Benchmark a running server over HTTP instead of in-process (GET only)')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='With --url: keep this many connections trickling unfinished requests meanwhile')
+        parser.add_argument('--server-pid', type=int, help="With --url: report this server's (master + workers) memory")
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE, help='Baseline JSON to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Allowed p95 latency/throughput drift, 0.5 = 50%% (query counts must not grow at all)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['url'] and (options['slow_clients'] or options['server_pid']):
+            raise CommandError('--slow-clients and --server-pid need --url')
+        if options['url']:
+            runner = benchmark.HttpRunner(options['url'], server_pid=options['server_pid'])
+        else:
+            runner = benchmark.InProcessRunner()
+        results = benchmark.run(
+            runner,
+            selected=options['endpoints'],
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            slow_clients=options['slow_clients'],
+        )
+        if not results:
+            raise CommandError('No endpoint matched')
+
+        header = f'{"endpoint":<22} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8} {"queries":>8} {"errors":>7}'
+        self.stdout.write(header)
+        for name, r in results.items():
+            queries = '-' if r['queries'] is None else r['queries']
+            self.stdout.write(
+                f'{name:<22} {r["p50_ms"]:>8} {r["p95_ms"]:>8} {r["p99_ms"]:>8} {r["rps"]:>8} {queries:>8} {r["errors"]:>7}'
+            )
+        if options['server_pid']:
+            peak = max(r.get('rss_mb', 0) for r in results.values())
+            self.stdout.write(f'Server memory (master + workers): {peak} MB peak RSS')
+
+        path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            benchmark.save_baseline(path, results, {
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'runner': runner.name,
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'slow_clients': options['slow_clients'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+            })
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(f'No baseline at {path}; run with --save-baseline to create one')
+            return
+        regressions = benchmark.compare(results, benchmark.load_baseline(path), options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} regression(s) against {path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.cache import bump_content_version
+from core.images import build_variants
+from core.models import Event, PressRelease, Video
+
+IMAGE_FIELDS = [
+    (Event, 'image', 'image_widths'),
+    (PressRelease, 'image', 'image_widths'),
+    (Video, 'thumbnail', 'thumbnail_widths'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/AVIF/JPEG variants for existing uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild variants even for images that already have them',
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name, widths_field in IMAGE_FIELDS:
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['force']:
+                queryset = queryset.filter(**{widths_field: []})
+
+            built = 0
+            for obj in queryset.only('pk', field_name).iterator(chunk_size=100):
+                widths = build_variants(getattr(obj, field_name))
+                # update() skips save(), so variants aren't rebuilt twice and
+                # post_save receivers don't run once per row. updated_at is
+                # bumped by hand so detail pages stop answering 304.
+                model.objects.filter(pk=obj.pk).update(
+                    **{widths_field: widths, 'updated_at': timezone.now()}
+                )
+                built += 1
+
+            if built:
+                bump_content_version(model)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {built} image(s) processed')
+        self.stdout.write(self.style.SUCCESS('Image variants are up to date'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core import sitemap_cache
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate sitemap.xml and its per-section files into SITEMAP_ROOT'
+
+    def handle(self, *args, **options):
+        counts = sitemap_cache.build_all()
+        for section, pages in counts.items():
+            self.stdout.write(f'{section}: {pages} file(s)')
+        self.stdout.write(self.style.SUCCESS('Sitemap built'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_site_version
+
+
+class Command(BaseCommand):
+    help = 'Retire cached pages and template fragments, e.g. after deploying new templates'
+
+    def handle(self, *args, **options):
+        bump_site_version()
+        self.stdout.write(self.style.SUCCESS('Site cache version bumped'))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from core import benchmark
+from core.query_budget import check_request
+from core.sitemaps import SITEMAPS
+
+# Pages without a benchmark endpoint (nothing to load-test there).
+EXTRA_PATHS = ['/about/', '/manifesto/', '/news-media/', '/contact/', '/comments/']
+
+
+def paths():
+    """One path per public GET view, detail pages taken from the database"""
+    result = [endpoint.paths[0] for endpoint in benchmark.endpoints() if endpoint.method == 'GET']
+    result += EXTRA_PATHS
+    result += [f'/sitemap-{section}-1.xml' for section in SITEMAPS]
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Request every public page cold and fail if a view exceeds its query budget or repeats a query per row'
+
+    def handle(self, *args, **options):
+        client = Client()
+        failures = 0
+        # No page or fragment caches, so every request does its full work.
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            PAGE_CACHE_ENABLED=False,
+        ):
+            for path in paths():
+                response, problems = check_request(client, path)
+                if response.status_code != 200:
+                    self.stderr.write(self.style.WARNING(f'{path}: status {response.status_code}'))
+                if problems:
+                    failures += 1
+                    self.stderr.write(self.style.ERROR(path))
+                    self.stderr.write('  ' + '\n  '.join(problems))
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{path}: ok')
+        if failures:
+            raise CommandError(f'{failures} page{"" if failures == 1 else "s"} over budget or repeating queries')
+        self.stdout.write(self.style.SUCCESS('All pages are within their query budgets'))
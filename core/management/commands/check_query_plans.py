@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.query_plans import check_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot listing/admin queries and fail if any needs a full scan or sort'
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name, (plan, problems) in check_plans().items():
+            if problems:
+                failures += 1
+                self.stderr.write(self.style.ERROR(f'{name}: {", ".join(problems)}'))
+                self.stderr.write(plan)
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'{name}:\n{plan}')
+        if failures:
+            raise CommandError(f'{failures} hot quer{"y" if failures == 1 else "ies"} regressed')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
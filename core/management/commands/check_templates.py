@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_warmup import compile_templates
+
+
+class Command(BaseCommand):
+    help = 'Compile every template in templates/ and fail if any has a syntax error'
+
+    def handle(self, *args, **options):
+        compiled, errors = compile_templates()
+        for name, exc in errors.items():
+            self.stderr.write(f'{name}: {exc}')
+        if errors:
+            raise CommandError(f'{len(errors)} template(s) failed to compile')
+        self.stdout.write(self.style.SUCCESS(f'{len(compiled)} template(s) compiled'))
@@ -0,0 +1,59 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import export
+from core.ingest import KINDS
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Export contact messages or comments as CSV or XLSX, streamed row by row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(KINDS))
+        parser.add_argument('--format', choices=sorted(export.WRITERS), default='csv')
+        parser.add_argument('-o', '--output', default='-', help='File to write, "-" for stdout (default)')
+        parser.add_argument('--upazila')
+        parser.add_argument('--union')
+        parser.add_argument('--since', type=parse_date, help='Created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', type=parse_date, help='Created on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--unread', action='store_true', help='Only messages not yet marked as read')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = KINDS[options['kind']].objects.order_by('-created_at', '-pk')
+        if options['upazila']:
+            queryset = queryset.filter(upazila=options['upazila'])
+        if options['union']:
+            queryset = queryset.filter(union=options['union'])
+        tz = timezone.get_current_timezone()
+        if options['since']:
+            start = datetime.datetime.combine(options['since'], datetime.time.min, tzinfo=tz)
+            queryset = queryset.filter(created_at__gte=start)
+        if options['until']:
+            end = datetime.datetime.combine(options['until'] + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+            queryset = queryset.filter(created_at__lt=end)
+        if options['unread']:
+            queryset = queryset.filter(is_read=False)
+
+        chunks = export.WRITERS[options['format']](queryset, chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        with open(options['output'], 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Exported {options["kind"]} to {options["output"]}'))
@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import ingest
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert spooled contact messages and comments (SUBMISSION_INGEST_MODE=spool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep flushing until interrupted instead of draining once',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to wait when the spool is empty (with --loop)',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Print queue depth and the last flush timings as JSON and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(ingest.queue_stats(), indent=2))
+            return
+
+        total = 0
+        try:
+            while True:
+                counts = ingest.flush_all(batch_size=options['batch_size'])
+                total += sum(counts.values())
+                if any(counts.values()):
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Inserted {total} submission(s)'))
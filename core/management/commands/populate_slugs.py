@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core import sitemap_cache
+from core.cache import bump_content_version
+from core.models import Event, PressRelease, Video
+from core.slugs import fill_missing
+
+
+class Command(BaseCommand):
+    help = 'Give every event, press release and video without a slug a unique one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in (Event, PressRelease, Video):
+            filled = fill_missing(model, batch_size=options['batch_size'])
+            if filled:
+                # bulk_update sends no signals; retire what the receivers would have.
+                bump_content_version(model)
+                sitemap_cache.invalidate_model(model)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {filled}')
+        self.stdout.write(self.style.SUCCESS('Slugs populated'))
@@ -0,0 +1,51 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import get_resolver
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = 'Switch the sampling profiler on or off for live requests, or print an X-Profile token'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, help='Fraction of requests to profile (default 0.01, or 1 with --view)')
+        parser.add_argument('--view', action='append', dest='views', default=[],
+                            help='Only profile this URL name, e.g. event_detail (repeatable)')
+        parser.add_argument('--minutes', type=float, default=15, help='Switch off again after this long')
+        parser.add_argument('--off', action='store_true', help='Stop profiling now')
+        parser.add_argument('--token', action='store_true', help='Print an X-Profile header value and exit')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(f'X-Profile: {profiling.make_token()}')
+            self.stdout.write(f'Valid for {settings.PROFILER_TOKEN_MAX_AGE}s; files go to {settings.PROFILER_DIR}')
+            return
+        if options['off']:
+            profiling.disable()
+            self.stdout.write(self.style.SUCCESS('Profiling switched off'))
+            return
+        if options['rate'] is None and not options['views']:
+            config = profiling.current_config()
+            if config is None:
+                self.stdout.write('Profiling is off')
+            else:
+                self.stdout.write(f'Profiling {config["rate"]:.1%} of requests to {", ".join(config["views"]) or "all views"} '
+                                  f'until {datetime.datetime.fromtimestamp(config["until"]):%H:%M:%S}')
+            return
+
+        known = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        unknown = sorted(set(options['views']) - known)
+        if unknown:
+            raise CommandError(f'Unknown URL name(s): {", ".join(unknown)}')
+        rate = options['rate'] if options['rate'] is not None else (1.0 if options['views'] else 0.01)
+        if not 0 < rate <= 1:
+            raise CommandError('--rate must be between 0 and 1')
+        profiling.enable(rate, options['views'], options['minutes'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Profiling {rate:.1%} of requests to {", ".join(options["views"]) or "all views"} '
+            f'for {options["minutes"]:g} minutes; workers pick this up within '
+            f'{settings.PROFILER_CONFIG_REFRESH:g}s, profiles go to {settings.PROFILER_DIR}'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core import ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the published-comment rating totals from scratch'
+
+    def handle(self, *args, **options):
+        groups = ratings.rebuild()
+        ratings.published_changed()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {groups} rating group(s)'))
@@ -0,0 +1,38 @@
+import time
+
+from captcha.models import CaptchaStore
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import captcha_pool
+
+
+class Command(BaseCommand):
+    help = 'Pre-render captcha challenges into the cache so requests never draw them inline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=settings.CAPTCHA_POOL_SIZE)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep the pool topped up until interrupted',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=10.0,
+            help='Seconds between top-ups (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                total += captcha_pool.refill(options['size'], batch_size=options['batch_size'])
+                CaptchaStore.remove_expired()
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Added {total} challenge(s), {captcha_pool.depth()} ready'
+        ))
@@ -0,0 +1,131 @@
+import datetime
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ratings, search, sitemap_cache
+from core.benchmark import SEED_EMAIL_DOMAIN, SEED_TAG
+from core.cache import bump_content_version, bump_site_version
+from core.models import Comment, ContactMessage, Event, PressRelease, Video
+from core.slugs import SlugAllocator
+
+WORDS = (
+    'সমাবেশ উন্নয়ন লোহাগাড়া সাতকানিয়া শিক্ষা স্বাস্থ্য কৃষি রাস্তা সেতু যুব নারী '
+    'কর্মসংস্থান ইশতেহার প্রচারণা মতবিনিময় উঠান বৈঠক জনসভা পরিকল্পনা প্রকল্প বিদ্যুৎ '
+    'campaign rally development meeting youth health'
+).split()
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+class Command(BaseCommand):
+    help = 'Insert tagged, realistic volumes of content and submissions for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--press', type=int, default=1000)
+        parser.add_argument('--videos', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--contacts', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, for reproducible data')
+        parser.add_argument('--clear', action='store_true', help='Only delete previously seeded rows')
+        parser.add_argument('--force', action='store_true', help='Allow running with DEBUG off')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to seed benchmark data with DEBUG off; pass --force if this is intended')
+
+        self.clear()
+        if options['clear']:
+            self.refresh()
+            self.stdout.write(self.style.SUCCESS('Removed seeded benchmark data'))
+            return
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        today = datetime.date.today()
+        area = [(upazila, union) for upazila, unions in ContactMessage.UPAZILA_UNION_MAP.items() for union in unions]
+
+        def title():
+            return f'{SEED_TAG} {sentence(rng, rng.randint(3, 7))}'
+
+        def day():
+            return today - datetime.timedelta(days=rng.randint(0, 3 * 365))
+
+        def with_slugs(model, objects):
+            allocator = SlugAllocator(model)
+            for obj in objects:
+                obj.slug = allocator.allocate(obj.title)
+            return objects
+
+        events = with_slugs(Event, [
+            Event(title=title(), date=day(), location=sentence(rng, 2), description=sentence(rng, 80))
+            for _ in range(options['events'])
+        ])
+        Event.objects.bulk_create(events, batch_size=batch_size)
+
+        press = with_slugs(PressRelease, [
+            PressRelease(
+                title=title(), date=day(), category=rng.choice(['Policy', 'Campaign']),
+                summary=sentence(rng, 30), content=sentence(rng, 300),
+            )
+            for _ in range(options['press'])
+        ])
+        PressRelease.objects.bulk_create(press, batch_size=batch_size)
+
+        videos = []
+        for i in range(options['videos']):
+            video = Video(title=title(), youtube_url=f'https://www.youtube.com/watch?v={i:011d}')
+            video.set_youtube_fields()
+            videos.append(video)
+        Video.objects.bulk_create(with_slugs(Video, videos), batch_size=batch_size)
+
+        comments = []
+        for i in range(options['comments']):
+            upazila, union = rng.choice(area)
+            comments.append(Comment(
+                name=f'Benchmark {i}', email=f'comment{i}@{SEED_EMAIL_DOMAIN}',
+                upazila=upazila, union=union, subject=sentence(rng, 3),
+                category=rng.choice(Comment.CATEGORY_CHOICES)[0],
+                rating=rng.choice([None, 1, 2, 3, 4, 4, 5, 5]),
+                message=sentence(rng, 40), is_read=rng.random() < 0.7, is_published=rng.random() < 0.4,
+            ))
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+        contacts = []
+        for i in range(options['contacts']):
+            upazila, union = rng.choice(area)
+            contacts.append(ContactMessage(
+                name=f'Benchmark {i}', email=f'contact{i}@{SEED_EMAIL_DOMAIN}', phone='01700000000',
+                upazila=upazila, union=union, department=rng.choice(ContactMessage.DEPARTMENT_CHOICES)[0],
+                message=sentence(rng, 40), is_read=rng.random() < 0.7,
+            ))
+        ContactMessage.objects.bulk_create(contacts, batch_size=batch_size)
+
+        self.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(events)} events, {len(press)} press releases, {len(videos)} videos, '
+            f'{len(comments)} comments and {len(contacts)} contact messages'
+        ))
+
+    def clear(self):
+        for model in (Event, PressRelease, Video):
+            model.objects.filter(title__startswith=SEED_TAG).delete()
+        seeded_comments = Comment.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}')
+        # Unpublished comments don't touch the rating totals one by one as they are deleted.
+        ratings.set_published(seeded_comments, False)
+        seeded_comments.delete()
+        ContactMessage.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').delete()
+
+    def refresh(self):
+        # bulk_create sends no signals; redo what the receivers would have done.
+        search.rebuild()
+        ratings.rebuild()
+        for model in (Event, PressRelease, Video, Comment):
+            bump_content_version(model)
+            sitemap_cache.invalidate_model(model)
+        bump_site_version()
@@ -0,0 +1,154 @@
+"""
+Production serving of user-uploaded media.
+
+Django only decides *whether* a file may be served (path sanity, existence,
+staff-only prefixes); the bytes themselves are moved without a gunicorn
+thread copying them through Python:
+
+- ``MEDIA_SERVE_MODE = 'accel'``: reply with an ``X-Accel-Redirect`` header
+  and let nginx stream the file (including Range requests) from its
+  ``internal`` location.
+- ``MEDIA_SERVE_MODE = 'sendfile'``: no proxy in front, so return a
+  FileResponse. gunicorn's ``wsgi.file_wrapper`` turns that into
+  ``os.sendfile()`` from the current file offset, which is also how single
+  byte ranges are answered.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    A file object limited to ``length`` bytes from ``start``.
+
+    ``fileno()`` is kept so gunicorn can still pass the descriptor to
+    os.sendfile(); it starts at the seeked offset and stops after
+    Content-Length bytes. Servers without a file wrapper fall back to the
+    bounded ``read()``.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) of a single ``bytes=`` range, inclusive.
+
+    ``None`` means the header should be ignored and the whole file sent
+    (absent, malformed or multi-range headers); ``ValueError`` means the
+    range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the final N bytes.
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def is_protected(path):
+    return any(path.startswith(prefix) for prefix in settings.MEDIA_PROTECTED_PREFIXES)
+
+
+def resolve_media_path(request, path):
+    """Map a URL path to a file under MEDIA_ROOT, enforcing access rules."""
+    path = posixpath.normpath(path).lstrip('/')
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404('Hidden files are not served')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+
+    if is_protected(path):
+        if not (request.user.is_active and request.user.is_staff):
+            raise PermissionDenied
+    if not os.path.isfile(fullpath):
+        raise Http404('Media file does not exist')
+    return path, fullpath
+
+
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT via nginx X-Accel-Redirect or sendfile."""
+    path, fullpath = resolve_media_path(request, path)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_SERVE_MODE == 'accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+
+    statobj = os.stat(fullpath)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), statobj.st_mtime):
+        return HttpResponseNotModified()
+
+    size = statobj.st_size
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(open(fullpath, 'rb'), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Last-Modified'] = http_date(statobj.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if is_protected(path):
+        # Staff-only: no shared cache may keep it. (nginx's internal
+        # location sends the same header in 'accel' mode.)
+        patch_cache_control(response, private=True, no_store=True)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,386 @@
+"""
+Per-request performance metrics in Prometheus text format.
+
+``MetricsMiddleware`` records, per view: request count by method and
+status, a latency histogram, SQL queries per request (histogram) and
+their total time, time spent rendering templates, and response sizes.
+
+Each gunicorn worker aggregates in memory, and a background thread writes
+a snapshot every METRICS_FLUSH_INTERVAL seconds to
+METRICS_DIR/<pid>-<random id>.json, with an atomic rename like the
+submission spool, so requests never wait on the disk. The random id keeps
+a new worker that reuses an old pid from overwriting the old worker's
+totals. Each worker holds an flock on its own ``.lock`` file while it
+lives; when a worker starts, it folds the snapshots of dead workers (their
+locks are free) into ``retired.json``, under a lock of its own so two
+workers starting together don't count a snapshot twice. The ``/metrics``
+view flushes its own worker, then sums ``retired.json`` and the live
+snapshots, so the counters keep rising across worker restarts and the
+scrape sees the whole container. A worker's last few seconds appear after
+its next flush. Only counters and histograms are stored per worker.
+Gauges (spool depth, captcha pool depth) are read at scrape time.
+
+This is the same shape as prometheus_client's multiprocess mode, without
+the dependency.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .db_hooks import query_hook
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'election'
+
+BUCKETS = {
+    'seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'queries': (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    'bytes': (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+
+# name -> (type, help, bucket set for histograms)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by view, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'Time from middleware entry to response, by view', 'seconds'),
+    'http_request_db_queries': ('histogram', 'SQL queries per request, by view', 'queries'),
+    'http_request_db_seconds_total': ('counter', 'Time spent executing SQL, by view', None),
+    'http_request_template_seconds_total': ('counter', 'Time spent rendering templates, by view', None),
+    'http_response_size_bytes': ('histogram', 'Response body size (non-streaming responses), by view', 'bytes'),
+}
+
+_template_seconds = ContextVar('template_seconds', default=None)
+
+RETIRED = 'retired.json'
+
+
+def _merge(merged, entries):
+    for name, labels, value in entries:
+        if name not in METRICS:
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, list):
+            current = merged.get(key)
+            if current is None or len(current) != len(value):
+                current = merged[key] = [0] * len(value)
+            for i, v in enumerate(value):
+                current[i] += v
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _entries(merged):
+    return [
+        [name, list(labels), list(value) if isinstance(value, list) else value]
+        for (name, labels), value in merged.items()
+    ]
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write(directory, filename, entries):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def _try_lock(path):
+    """Open ``path`` and take its flock, or return None if it is held"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+@contextmanager
+def _retired_lock(directory, operation):
+    """Hold the lock that keeps folding and reading the snapshots apart"""
+    fd = os.open(os.path.join(directory, 'retired.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, operation)
+        yield
+    finally:
+        os.close(fd)
+
+
+def retire_dead_workers(directory):
+    """Fold the snapshots of workers that have exited into ``retired.json``"""
+    with _retired_lock(directory, fcntl.LOCK_EX):
+        retired = _merge({}, _read(os.path.join(directory, RETIRED)))
+        folded = []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == RETIRED:
+                continue
+            lock_path = os.path.join(directory, filename[:-len('.json')] + '.lock')
+            owner = None
+            if os.path.exists(lock_path):
+                owner = _try_lock(lock_path)
+                if owner is None:
+                    continue  # still running
+            # else: a <pid>.json from before the lock files; its worker is gone.
+            _merge(retired, _read(os.path.join(directory, filename)))
+            folded.append((filename, lock_path, owner))
+        if folded:
+            _write(directory, RETIRED, _entries(retired))
+        for filename, lock_path, owner in folded:
+            os.remove(os.path.join(directory, filename))
+            if owner is not None:
+                os.remove(lock_path)
+                os.close(owner)
+        return len(folded)
+
+
+class Registry:
+    """Counters and histograms of this process, keyed by (metric, labels)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.pid = None
+        self.name = None
+        self.owner = None
+
+    def start(self):
+        """Claim a snapshot file for this process and start flushing it"""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            pid = os.getpid()
+            if self.pid == pid:
+                return
+            if self.pid is not None:
+                # Forked from a process that had already counted: those
+                # requests belong to the parent's snapshot.
+                self.values = {}
+            self.pid = pid
+            self.name = f'{pid}-{uuid.uuid4().hex}'
+        directory = settings.METRICS_DIR
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.owner = _try_lock(os.path.join(directory, f'{self.name}.lock'))
+            retire_dead_workers(directory)
+        except OSError:
+            logger.exception('Could not retire old metrics snapshots in %s', directory)
+        threading.Thread(target=self.run, args=(pid,), name='metrics-flush', daemon=True).start()
+
+    def run(self, pid):
+        while self.pid == pid:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        bounds = BUCKETS[METRICS[name][2]]
+        key = (name, labels)
+        with self.lock:
+            # Per-bucket (non-cumulative) counts, then +Inf, sum and count.
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(bounds) + 3)
+            entry[bisect_left(bounds, value)] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return _entries(self.values)
+
+    def flush(self):
+        """Write this worker's snapshot"""
+        if self.pid != os.getpid():
+            return
+        directory = settings.METRICS_DIR
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write(directory, f'{self.name}.json', self.snapshot())
+        except OSError:
+            logger.exception('Could not write metrics snapshot to %s', directory)
+
+
+registry = Registry()
+
+
+def _flush_at_exit():
+    if settings.METRICS_ENABLED and registry.values:
+        registry.flush()
+
+
+atexit.register(_flush_at_exit)
+
+
+def collect():
+    """Sum the retired totals and every live worker into ``{(name, labels): value}``"""
+    registry.flush()
+    merged = {}
+    directory = settings.METRICS_DIR
+    if not os.path.isdir(directory):
+        return merged
+    # Shared with other scrapes, exclusive of a fold: a snapshot is never
+    # counted both in retired.json and on its own.
+    with _retired_lock(directory, fcntl.LOCK_SH):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                _merge(merged, _read(os.path.join(directory, filename)))
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged, gauges=()):
+    """Format merged metrics and ``[(name, help, [(labels, value)])]`` gauges"""
+    lines = []
+    for name, (kind, help_text, bucket_set) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        full_name = f'{PREFIX}_{name}'
+        lines += [f'# HELP {full_name} {help_text}', f'# TYPE {full_name} {kind}']
+        for labels, value in series:
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(BUCKETS[bucket_set] + ('+Inf',), value):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{full_name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{full_name}_sum{_labels(labels)} {_number(value[-2])}')
+                lines.append(f'{full_name}_count{_labels(labels)} {value[-1]}')
+            else:
+                lines.append(f'{full_name}{_labels(labels)} {_number(value)}')
+    for name, help_text, samples in gauges:
+        full_name = f'{PREFIX}_{name}'
+        lines += [f'# HELP {full_name} {help_text}', f'# TYPE {full_name} gauge']
+        lines += [f'{full_name}{_labels(labels)} {_number(value)}' for labels, value in samples]
+    return '\n'.join(lines) + '\n'
+
+
+def instrument_templates():
+    """Time every top-level template render for the current request."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        spent = _template_seconds.get()
+        if spent is None:
+            return original(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            spent[0] += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name
+
+
+class RequestMeasurement:
+    """Wall time, SQL queries and template render time of one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = [0.0]
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        self.stack.enter_context(query_hook(self))
+        self.stack.callback(_template_seconds.reset, _template_seconds.set(self.template_seconds))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.stack.close()
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Record latency, SQL and template time and response size per view."""
+
+    def handle(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        with RequestMeasurement() as measured:
+            response = self.get_response(request)
+        return self.record(request, response, measured)
+
+    async def ahandle(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        with RequestMeasurement() as measured:
+            response = await self.get_response(request)
+        return self.record(request, response, measured)
+
+    def record(self, request, response, measured):
+        registry.start()
+        view = (('view', _view_name(request)),)
+        registry.inc('http_requests_total', view + (('method', request.method), ('status', str(response.status_code))))
+        registry.observe('http_request_duration_seconds', view, measured.elapsed)
+        registry.observe('http_request_db_queries', view, measured.queries)
+        registry.inc('http_request_db_seconds_total', view, measured.db_seconds)
+        registry.inc('http_request_template_seconds_total', view, measured.template_seconds[0])
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', view, len(response.content))
+
+        if measured.elapsed >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            logger.warning(
+                'Slow request %s %s (%s): %.3fs, %d queries in %.3fs, templates %.3fs',
+                request.method, request.path, view[0][1], measured.elapsed,
+                measured.queries, measured.db_seconds, measured.template_seconds[0],
+            )
+        return response
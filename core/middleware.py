@@ -0,0 +1,34 @@
+"""
+Base class for the project's middleware.
+
+Under ASGI, a middleware that only supports sync makes Django run
+everything inside it in a thread, async views included. The project's
+middleware therefore support both modes. Subclasses implement
+``handle(request)`` for WSGI and ``ahandle(request)`` for ASGI, and
+Django picks the mode from ``get_response`` as it does for its own
+middleware.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+class HybridMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
@@ -1,45 +1,56 @@
 # Generated by Django 5.2 on 2025-12-21 13:17
 
-from django.db import migrations
+import re
 
+from django.db import migrations
+from django.db.models import Q
+
+# A frozen copy of core.slugs as of this migration, so later changes to
+# the slug rules don't change what it does.
+SUFFIX_ROOM = 10
+BATCH_SIZE = 500
+
+
+def custom_slugify(value):
+    value = re.sub(r'[^\u0980-\u09ff\w\s-]', '', value)
+    return re.sub(r'[-\s]+', '-', value).strip('-')
+
+
+def used_suffixes(queryset, base):
+    suffix_re = re.compile(rf'^{re.escape(base)}-(\d+)$')
+    used = set()
+    for slug in queryset.filter(Q(slug=base) | Q(slug__startswith=f'{base}-')).values_list('slug', flat=True):
+        if slug == base:
+            used.add(0)
+        elif match := suffix_re.match(slug):
+            used.add(int(match.group(1)))
+    return used
+
+
+def fill_missing(model, using):
+    queryset = model._default_manager.using(using)
+    max_length = model._meta.get_field('slug').max_length
+    missing = queryset.filter(Q(slug__isnull=True) | Q(slug='')).order_by('pk')
+    while True:
+        batch = list(missing.only('pk', 'title')[:BATCH_SIZE])
+        if not batch:
+            return
+        used = {}
+        for obj in batch:
+            base = custom_slugify(obj.title or '')[:max_length - SUFFIX_ROOM].strip('-') or model._meta.model_name
+            if base not in used:
+                used[base] = used_suffixes(queryset, base)
+            suffix = 0 if 0 not in used[base] else max(used[base]) + 1
+            used[base].add(suffix)
+            obj.slug = f'{base}-{suffix}' if suffix else base
+        queryset.bulk_update(batch, ['slug'])
 
-from django.utils.text import slugify
 
 def populate_slugs(apps, schema_editor):
-    Event = apps.get_model('core', 'Event')
-    PressRelease = apps.get_model('core', 'PressRelease')
-    Video = apps.get_model('core', 'Video')
-
-    for event in Event.objects.all():
-        if not event.slug:
-            event.slug = slugify(event.title)
-            # Ensure uniqueness
-            base_slug = event.slug
-            count = 1
-            while Event.objects.filter(slug=event.slug).exclude(pk=event.pk).exists():
-                event.slug = f"{base_slug}-{count}"
-                count += 1
-            event.save()
-
-    for press in PressRelease.objects.all():
-        if not press.slug:
-            press.slug = slugify(press.title)
-            base_slug = press.slug
-            count = 1
-            while PressRelease.objects.filter(slug=press.slug).exclude(pk=press.pk).exists():
-                press.slug = f"{base_slug}-{count}"
-                count += 1
-            press.save()
-
-    for video in Video.objects.all():
-        if not video.slug:
-            video.slug = slugify(video.title)
-            base_slug = video.slug
-            count = 1
-            while Video.objects.filter(slug=video.slug).exclude(pk=video.pk).exists():
-                video.slug = f"{base_slug}-{count}"
-                count += 1
-            video.save()
+    # Only rows without a slug are touched, in batches, so this is safe to
+    # re-run (``manage.py populate_slugs`` does the same on a live database).
+    for model_name in ('Event', 'PressRelease', 'Video'):
+        fill_missing(apps.get_model('core', model_name), schema_editor.connection.alias)
 
 class Migration(migrations.Migration):
 
@@ -48,5 +59,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunPython(populate_slugs),
+        migrations.RunPython(populate_slugs, migrations.RunPython.noop),
     ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_comment_union_comment_upazila'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='image_widths',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pressrelease',
+            name='image_widths',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_widths',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
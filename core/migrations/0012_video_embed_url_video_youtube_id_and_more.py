@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-17 05:55
+
+import re
+
+from django.db import migrations, models
+
+YOUTUBE_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11}).*')
+
+
+def populate_youtube_fields(apps, schema_editor):
+    Video = apps.get_model('core', 'Video')
+
+    videos = list(Video.objects.only('pk', 'youtube_url'))
+    for video in videos:
+        match = YOUTUBE_ID_RE.search(video.youtube_url or '')
+        video.youtube_id = match.group(1) if match else ''
+        if video.youtube_id:
+            video.embed_url = f'https://www.youtube.com/embed/{video.youtube_id}'
+            video.youtube_thumbnail_url = f'https://img.youtube.com/vi/{video.youtube_id}/maxresdefault.jpg'
+    Video.objects.bulk_update(
+        videos, ['youtube_id', 'embed_url', 'youtube_thumbnail_url'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_event_image_widths_pressrelease_image_widths_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='embed_url',
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='youtube_id',
+            field=models.CharField(blank=True, editable=False, max_length=11),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='youtube_thumbnail_url',
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.RunPython(populate_youtube_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_video_embed_url_video_youtube_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='pressrelease',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2 on 2026-10-17 05:58
+
+import re
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+# A frozen copy of core.search as of this migration, so later changes to
+# the tokenizer or the indexed fields don't change what it does.
+FTS_TABLE = 'core_searchdocument_fts'
+TOKEN_RE = re.compile(r'[\u0980-\u09ff\w]+')
+SOURCES = {
+    'event': ('Event', 'title', ['description', 'location']),
+    'press': ('PressRelease', 'title', ['summary', 'content', 'category']),
+    'video': ('Video', 'title', []),
+}
+
+
+def tokens(value):
+    return ' '.join(TOKEN_RE.findall((value or '').lower()))
+
+
+def create_backend_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX core_searchdocument_vector_gin '
+            'ON core_searchdocument USING gin (search_vector)'
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, body, tokenize='ascii')"
+        )
+
+
+def drop_backend_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_searchdocument_vector_gin')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def populate_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    connection = schema_editor.connection
+    alias = connection.alias
+
+    documents = []
+    for kind, (model_name, title_field, body_fields) in SOURCES.items():
+        Model = apps.get_model('core', model_name)
+        for obj in Model.objects.using(alias).only('pk', title_field, *body_fields).iterator():
+            title = tokens(getattr(obj, title_field))
+            body = tokens(' '.join(str(getattr(obj, f) or '') for f in body_fields))
+            documents.append(SearchDocument(kind=kind, object_id=obj.pk, title=title, body=body))
+    SearchDocument.objects.using(alias).bulk_create(documents, batch_size=500)
+
+    if connection.vendor == 'postgresql':
+        SearchDocument.objects.using(alias).update(
+            search_vector=(
+                SearchVector('title', weight='A', config='simple')
+                + SearchVector('body', weight='B', config='simple')
+            )
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                list(SearchDocument.objects.using(alias).values_list('pk', 'title', 'body')),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_event_updated_at_pressrelease_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event', 'কার্যক্রম'), ('press', 'প্রেস রিলিজ'), ('video', 'ভিডিও')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='core_searchdocument_kind_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_backend_index, drop_backend_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
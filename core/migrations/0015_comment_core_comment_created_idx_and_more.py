@@ -0,0 +1,76 @@
+# Generated by Django 5.2 on 2026-10-17 06:08
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL, so the large comment and
+    message tables keep taking writes while it builds. Other databases
+    (SQLite in development) get a plain CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_searchdocument'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='comment',
+            index=models.Index(fields=['-created_at', '-id'], name='core_comment_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='comment',
+            index=models.Index(fields=['upazila', 'union', '-created_at', '-id'], name='core_comment_area_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['upazila', '-created_at', '-id'], name='core_comment_unread_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at', '-id'], name='core_comment_published_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at', '-id'], name='core_contact_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='contactmessage',
+            index=models.Index(fields=['upazila', 'union', '-created_at', '-id'], name='core_contact_area_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['upazila', '-created_at', '-id'], name='core_contact_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-date', '-id'], name='core_event_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pressrelease',
+            index=models.Index(fields=['-date', '-id'], name='core_press_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-created_at', '-id'], name='core_video_created_id_idx'),
+        ),
+    ]
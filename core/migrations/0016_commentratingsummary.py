@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 06:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def populate_rating_summary(apps, schema_editor):
+    Comment = apps.get_model('core', 'Comment')
+    CommentRatingSummary = apps.get_model('core', 'CommentRatingSummary')
+    rated = Q(rating__in=RATINGS)
+    rows = Comment.objects.filter(is_published=True).values('upazila', 'union', 'category').annotate(
+        count=Count('id'),
+        rated_count=Count('rating', filter=rated),
+        rating_sum=Coalesce(Sum('rating', filter=rated), 0),
+        **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in RATINGS},
+    ).order_by()
+    CommentRatingSummary.objects.bulk_create(CommentRatingSummary(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_comment_core_comment_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentRatingSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upazila', models.CharField(blank=True, default='', max_length=50)),
+                ('union', models.CharField(blank=True, default='', max_length=50)),
+                ('category', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rated_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('upazila', 'union', 'category'), name='core_commentratingsummary_group_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_rating_summary, migrations.RunPython.noop),
+    ]
@@ -1,23 +1,36 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.utils.text import slugify
 import re
 
-def custom_slugify(value):
-    # Keep Bangla characters, alphanumeric, and hyphens
-    value = re.sub(r'[^\u0980-\u09ff\w\s-]', '', value)
-    return re.sub(r'[-\s]+', '-', value).strip('-')
+from .images import picture_sources, refresh_variants
+from .slugs import UniqueSlugMixin
 
-class Event(models.Model):
+YOUTUBE_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11}).*')
+
+def extract_youtube_id(url):
+    """
+    Extract YouTube video ID from various URL formats:
+    - https://www.youtube.com/watch?v=VIDEO_ID
+    - https://youtu.be/VIDEO_ID
+    - https://www.youtube.com/embed/VIDEO_ID
+    """
+    if not url:
+        return ''
+    match = YOUTUBE_ID_RE.search(url)
+    return match.group(1) if match else ''
+
+class Event(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
     date = models.DateField()
     location = models.CharField(max_length=200)
     description = models.TextField()
     image = models.ImageField(upload_to='events/', blank=True, null=True)
+    image_widths = models.JSONField(default=list, blank=True, editable=False)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = custom_slugify(self.title)
+        refresh_variants(self, 'image', 'image_widths')
         super().save(*args, **kwargs)
 
     def get_image_url(self):
@@ -26,13 +39,21 @@ class Event(models.Model):
             return self.image.url
         return '/static/assets/images/thumbnil.png'
 
+    def get_image_sources(self):
+        """Return <picture> sources for the resized image variants"""
+        return picture_sources(self.image, self.image_widths)
+
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Listing and keyset pagination: ORDER BY date DESC, id DESC.
+            models.Index(fields=['-date', '-id'], name='core_event_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
-class PressRelease(models.Model):
+class PressRelease(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
     date = models.DateField()
     category = models.CharField(max_length=100, help_text="e.g., Policy, Campaign")
@@ -40,63 +61,89 @@ class PressRelease(models.Model):
     content = models.TextField()
     document = models.FileField(upload_to='press_releases/docs/', blank=True, null=True)
     image = models.ImageField(upload_to='press_releases/images/', blank=True, null=True)
+    image_widths = models.JSONField(default=list, blank=True, editable=False)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = custom_slugify(self.title)
+        refresh_variants(self, 'image', 'image_widths')
         super().save(*args, **kwargs)
 
+    def get_image_sources(self):
+        """Return <picture> sources for the resized image variants"""
+        return picture_sources(self.image, self.image_widths)
+
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='core_press_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
-class Video(models.Model):
+class Video(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
     youtube_url = models.URLField()
+    # Derived from youtube_url on save so templates never run the regex
+    youtube_id = models.CharField(max_length=11, blank=True, editable=False)
+    embed_url = models.URLField(blank=True, editable=False)
+    youtube_thumbnail_url = models.URLField(blank=True, editable=False)
     thumbnail = models.ImageField(upload_to='videos/', blank=True, null=True)
+    thumbnail_widths = models.JSONField(default=list, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = custom_slugify(self.title)
+        refresh_variants(self, 'thumbnail', 'thumbnail_widths')
+        self.set_youtube_fields()
         super().save(*args, **kwargs)
 
-    def get_thumbnail_url(self):
-        """Return thumbnail URL, YouTube thumbnail, or default image"""
-        if self.thumbnail:
-            return self.thumbnail.url
-        
-        # Try to get YouTube thumbnail
-        video_id = self.get_video_id()
-        if video_id:
+    def set_youtube_fields(self):
+        """Derive the video ID and canonical embed/thumbnail URLs from youtube_url"""
+        self.youtube_id = extract_youtube_id(self.youtube_url)
+        if self.youtube_id:
+            self.embed_url = f'https://www.youtube.com/embed/{self.youtube_id}'
             # YouTube provides thumbnails at different qualities
             # maxresdefault.jpg (1920x1080) - highest quality
             # sddefault.jpg (640x480) - standard quality
             # hqdefault.jpg (480x360) - high quality
             # mqdefault.jpg (320x180) - medium quality
             # default.jpg (120x90) - default quality
-            return f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg'
+            self.youtube_thumbnail_url = f'https://img.youtube.com/vi/{self.youtube_id}/maxresdefault.jpg'
+        else:
+            self.embed_url = ''
+            self.youtube_thumbnail_url = ''
+
+    def get_thumbnail_url(self):
+        """Return thumbnail URL, YouTube thumbnail, or default image"""
+        if self.thumbnail:
+            return self.thumbnail.url
+        
+        # Try to get YouTube thumbnail
+        if self.youtube_thumbnail_url:
+            return self.youtube_thumbnail_url
         
         # Fallback to static default image
         return '/static/assets/images/thumbnil.png'
 
+    def get_thumbnail_sources(self):
+        """Return <picture> sources for an uploaded thumbnail's variants"""
+        return picture_sources(self.thumbnail, self.thumbnail_widths)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='core_video_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
     def get_video_id(self):
-        """Extract YouTube video ID from URL"""
-        import re
-        if not self.youtube_url:
-            return ''
-        match = re.search(r'(?:v=|/)([0-9A-Za-z_-]{11}).*', self.youtube_url)
-        return match.group(1) if match else ''
+        """Return the YouTube video ID parsed from the URL on save"""
+        return self.youtube_id
 
 class ContactMessage(models.Model):
     DEPARTMENT_CHOICES = [
@@ -156,6 +203,17 @@ class ContactMessage(models.Model):
         verbose_name = 'যোগাযোগ বার্তা'
         verbose_name_plural = 'যোগাযোগ বার্তাসমূহ'
         ordering = ['-created_at']
+        # The admin changelist appends -id to the ordering, so every index
+        # ends with (created_at DESC, id DESC) to avoid a sort step.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='core_contact_created_idx'),
+            models.Index(fields=['upazila', 'union', '-created_at', '-id'], name='core_contact_area_idx'),
+            models.Index(
+                fields=['upazila', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='core_contact_unread_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.upazila} - {self.union} ({self.created_at.strftime('%d %b %Y')})"
@@ -209,6 +267,20 @@ class Comment(models.Model):
         verbose_name = 'মতামত'
         verbose_name_plural = 'মতামতসমূহ'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='core_comment_created_idx'),
+            models.Index(fields=['upazila', 'union', '-created_at', '-id'], name='core_comment_area_idx'),
+            models.Index(
+                fields=['upazila', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='core_comment_unread_idx',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_published=True),
+                name='core_comment_published_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.upazila} - {self.union} ({self.created_at.strftime('%d %b %Y')})"
@@ -221,3 +293,62 @@ class Comment(models.Model):
                 raise ValidationError({
                     'union': f'নির্বাচিত ইউনিয়ন/পৌরসভা এই উপজেলার জন্য বৈধ নয়।'
                 })
+
+
+class CommentRatingSummary(models.Model):
+    """
+    Running totals over published comments for one (upazila, union,
+    category) group, kept up to date by core.ratings whenever a comment is
+    published, unpublished, edited or deleted.
+    """
+    upazila = models.CharField(max_length=50, blank=True, default='')
+    union = models.CharField(max_length=50, blank=True, default='')
+    category = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+    rated_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['upazila', 'union', 'category'], name='core_commentratingsummary_group_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.upazila}/{self.union}/{self.category}: {self.count}"
+
+
+class SearchDocument(models.Model):
+    """
+    Search index entry for one Event, PressRelease or Video.
+
+    ``title`` and ``body`` hold pre-tokenised text (see core.search). On
+    PostgreSQL ``search_vector`` is filled from them and GIN-indexed; on
+    SQLite a companion FTS5 table is used instead and the column stays null.
+    """
+    KIND_CHOICES = [
+        ('event', 'কার্যক্রম'),
+        ('press', 'প্রেস রিলিজ'),
+        ('video', 'ভিডিও'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='core_searchdocument_kind_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
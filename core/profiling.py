@@ -0,0 +1,273 @@
+"""
+Sampling profiler for live requests.
+
+Profiling is switched on at runtime, without a deploy, in two ways:
+
+- ``manage.py profile_requests --rate 0.02 [--view event_detail]``
+  stores a sampling config in the default cache, so every worker picks it
+  up within PROFILER_CONFIG_REFRESH seconds. It expires on its own after
+  ``--minutes`` and ``--off`` clears it earlier.
+- A request carrying ``X-Profile: <token>`` is always profiled.
+  ``manage.py profile_requests --token`` prints a token, signed with
+  SECRET_KEY and valid for PROFILER_TOKEN_MAX_AGE seconds.
+
+For a profiled request a sampler thread reads the request thread's stack
+(under ASGI: the request's chain of coroutines) every PROFILER_INTERVAL
+seconds. This is wall-clock sampling, so time spent waiting on the
+database or the cache shows up too. The samples are written
+to PROFILER_DIR (logs/profiles/) in the folded format that flamegraph.pl,
+speedscope and inferno read: one ``frame;frame;frame count`` line per
+distinct stack, rooted at the view name.
+
+The overhead is bounded. A worker profiles at most PROFILER_MAX_CONCURRENT
+requests at once, a sampler stops after PROFILER_MAX_SECONDS, and only the
+newest PROFILER_MAX_FILES profiles are kept. While profiling is off a
+request costs one header lookup and a clock read; the shared config is
+re-read from the cache at most every PROFILER_CONFIG_REFRESH seconds.
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+CONFIG_KEY = 'profiler:config'
+TOKEN_SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+HEADER = 'HTTP_X_PROFILE'
+
+_config = {'value': None, 'expires': 0.0}
+_sequence = iter(range(sys.maxsize))
+
+
+def enable(rate, views=(), minutes=15):
+    """Profile ``rate`` of the requests (to ``views`` only, if given) for ``minutes``"""
+    config = {'rate': rate, 'views': sorted(views), 'until': time.time() + minutes * 60}
+    cache.set(CONFIG_KEY, config, timeout=int(minutes * 60) + 1)
+    return config
+
+
+def disable():
+    cache.delete(CONFIG_KEY)
+
+
+def current_config():
+    """The active sampling config, read from the cache at most every few seconds"""
+    now = time.monotonic()
+    if now >= _config['expires']:
+        _config['value'] = cache.get(CONFIG_KEY)
+        _config['expires'] = now + settings.PROFILER_CONFIG_REFRESH
+    config = _config['value']
+    if config and config['until'] > time.time():
+        return config
+    return None
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def _token_valid(token):
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        logger.info('Ignoring invalid or expired X-Profile token')
+        return False
+    return value == TOKEN_VALUE
+
+
+def _view_name(path):
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return None
+
+
+def should_profile(request):
+    """Return ``'token'``, ``'sampled'`` or None for this request"""
+    token = request.META.get(HEADER)
+    if token and _token_valid(token):
+        return 'token'
+    config = current_config()
+    if config is None:
+        return None
+    if config['views'] and _view_name(request.path_info) not in config['views']:
+        return None
+    return 'sampled' if random.random() < config['rate'] else None
+
+
+def _short_path(filename):
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    base_dir = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base_dir):
+        return filename[len(base_dir):]
+    return filename
+
+
+def thread_frames(thread_id, stop_frame):
+    """``(code, lineno)`` of a thread's stack below ``stop_frame``, outermost first"""
+    frames = []
+    frame = sys._current_frames().get(thread_id)
+    while frame is not None and frame is not stop_frame:
+        frames.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def coroutine_frames(coro):
+    """
+    ``(code, lineno)`` of a coroutine and everything it awaits, outermost
+    first. The chain ends at the awaited future, e.g. the thread running an
+    ORM call, so waiting time is charged to the line that awaited it.
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append((frame.f_code, frame.f_lineno))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return frames
+
+
+class Sampler:
+    """Collect the stacks returned by ``frames()`` until the block ends."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.stacks = Counter()
+        self.labels = {}
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _label(self, code, lineno):
+        key = (code, lineno)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = f'{code.co_qualname} ({_short_path(code.co_filename)}:{lineno})'
+        return label
+
+    def _sample(self):
+        stack = tuple(self._label(code, lineno) for code, lineno in self.frames())
+        # A sample taken while the block exits would only show the profiler.
+        if stack and not self.done.is_set():
+            self.stacks[stack] += 1
+
+    def _run(self):
+        deadline = self.started + settings.PROFILER_MAX_SECONDS
+        while not self.done.wait(settings.PROFILER_INTERVAL):
+            if time.perf_counter() >= deadline:
+                logger.info('Profiler stopped sampling after %ss', settings.PROFILER_MAX_SECONDS)
+                return
+            self._sample()
+
+
+def folded(stacks, root):
+    """Format ``{stack: count}`` as folded stack lines under ``root``"""
+    return ''.join(
+        f'{";".join((root, *stack))} {count}\n'
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    )
+
+
+def _prune(directory):
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    for name in names[:-settings.PROFILER_MAX_FILES]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def write_profile(view, stacks):
+    """Write one request's samples to PROFILER_DIR and return the file name"""
+    directory = settings.PROFILER_DIR
+    safe_view = ''.join(c if c.isalnum() or c in '-_' else '_' for c in view)
+    filename = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-{next(_sequence)}-{safe_view}.folded'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(folded(stacks, view))
+    os.replace(tmp_path, os.path.join(directory, filename))
+    _prune(directory)
+    return filename
+
+
+class ProfilerMiddleware(HybridMiddleware):
+    """Sample the stacks of requests picked by should_profile()."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.slots = threading.BoundedSemaphore(settings.PROFILER_MAX_CONCURRENT)
+
+    def handle(self, request):
+        if not settings.PROFILER_ENABLED:
+            return self.get_response(request)
+        reason = should_profile(request)
+        if reason is None or not self.slots.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            with Sampler(partial(thread_frames, threading.get_ident(), sys._getframe())) as sampler:
+                response = self.get_response(request)
+        finally:
+            self.slots.release()
+        return self.save(request, response, sampler, reason)
+
+    async def ahandle(self, request):
+        if not settings.PROFILER_ENABLED:
+            return await self.get_response(request)
+        reason = should_profile(request)
+        if reason is None or not self.slots.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            # The event loop thread interleaves requests, so follow this
+            # request's coroutine chain instead of the thread's stack.
+            awaitable = self.get_response(request)
+            with Sampler(partial(coroutine_frames, awaitable)) as sampler:
+                response = await awaitable
+        finally:
+            self.slots.release()
+        return self.save(request, response, sampler, reason)
+
+    def save(self, request, response, sampler, reason):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        try:
+            filename = write_profile(view, sampler.stacks)
+        except OSError:
+            logger.exception('Could not write profile to %s', settings.PROFILER_DIR)
+            return response
+        logger.info('Profiled %s %s (%s, %s): %.3fs, %d samples -> %s',
+                    request.method, request.path, view, reason, sampler.elapsed,
+                    sum(sampler.stacks.values()), filename)
+        if reason == 'token':
+            response['X-Profile-File'] = filename
+        return response
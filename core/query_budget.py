@@ -0,0 +1,202 @@
+"""
+Per-view query budgets and repeated-query (N+1) detection.
+
+Views declare the most SQL queries one request may take::
+
+    @use_replica
+    @cache_page_for(Event)
+    @query_budget(3)
+    def events(request):
+        ...
+
+The budget counts the queries of a cold request (page cache off, empty
+fragment caches). ``QueryBudgetMiddleware`` (QUERY_BUDGET_ENABLED,
+on by default in DEBUG) records every query of a request, and logs a
+warning when:
+
+- the view went over its budget, or
+- the same SQL shape (the statement with its parameters left out) ran
+  QUERY_BUDGET_REPEAT_THRESHOLD times or more, the usual sign of a
+  query per row.
+
+Each report lists the offending shapes with the template line and the
+project code line that issued them. ``check_request()`` returns the same
+report for one test-client request, and ``manage.py check_query_budgets``
+runs it over the public pages so CI fails when a budget is exceeded.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import AsyncToSync, SyncToAsync
+from django.conf import settings
+from django.urls import resolve
+
+from . import db_hooks, metrics
+from .middleware import HybridMiddleware
+from .profiling import coroutine_frames
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+WHITESPACE_RE = re.compile(r'\s+')
+# Instrumentation frames (the query hook dispatcher, the hooks here and in
+# core.metrics, the timed template render) are skipped when looking for the
+# calling code.
+INSTRUMENTATION_FILES = {os.path.abspath(path) for path in (__file__, db_hooks.__file__, metrics.__file__)}
+# Where asgiref hands a call between the event loop and a sync thread.
+ASYNC_TO_SYNC_CODE = AsyncToSync.__call__.__code__
+THREAD_HANDLER_CODE = SyncToAsync.thread_handler.__code__
+
+
+def query_budget(max_queries):
+    """Declare the most queries one request to the decorated view may run."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def shape(sql):
+    """The statement with IN lists collapsed, so rows of an N+1 compare equal"""
+    return IN_LIST_RE.sub('IN (...)', WHITESPACE_RE.sub(' ', sql).strip())
+
+
+def _project_line(code, lineno):
+    base_dir = str(settings.BASE_DIR)
+    filename = code.co_filename
+    if filename.startswith(base_dir) and 'site-packages' not in filename and filename not in INSTRUMENTATION_FILES:
+        return f'{filename[len(base_dir) + 1:]}:{lineno} in {code.co_qualname}'
+    return None
+
+
+def _location(task=None):
+    """
+    Return ``(template line, project code line)`` of the running query.
+
+    The ORM calls of an async view run in a thread whose stack above the
+    asgiref hand-over only shows middleware, so the code line is then
+    taken from the coroutines waiting on it: the ``AsyncToSync`` call's
+    awaitable under WSGI, the request's ``task`` under ASGI.
+    """
+    template = code = None
+    coro = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and code):
+        if frame.f_code is ASYNC_TO_SYNC_CODE:
+            coro = frame.f_locals.get('awaitable')
+            break
+        if frame.f_code is THREAD_HANDLER_CODE and task is not None:
+            coro = task.get_coro()
+            break
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        if code is None:
+            code = _project_line(frame.f_code, frame.f_lineno)
+        frame = frame.f_back
+    if code is None and coro is not None:
+        # The innermost project coroutine is the one that ran the query.
+        for co, lineno in reversed(coroutine_frames(coro)):
+            code = _project_line(co, lineno)
+            if code:
+                break
+    return template, code
+
+
+class QueryRecorder:
+    """Collect the shape and origin of every query run while recording."""
+
+    def __init__(self, task=None):
+        self.task = task
+        self.count = 0
+        self.shapes = Counter()
+        self.locations = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        key = shape(sql)
+        self.shapes[key] += 1
+        self.locations[key][_location(self.task)] += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self):
+        with db_hooks.query_hook(self):
+            yield self
+
+    def repeated(self, threshold=None):
+        threshold = threshold or settings.QUERY_BUDGET_REPEAT_THRESHOLD
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= threshold]
+
+    def problems(self, budget):
+        """Return the report lines for this request, empty if it is fine"""
+        lines = []
+        repeated = self.repeated()
+        if budget is not None and self.count > budget:
+            lines.append(f'{self.count} queries, budget {budget}')
+            if not repeated:
+                for sql, n in self.shapes.most_common(5):
+                    lines.append(f'{n}x {sql[:300]}')
+                    lines += self._where(sql)
+        for sql, n in repeated:
+            lines.append(f'same query {n} times: {sql[:300]}')
+            lines += self._where(sql)
+        return lines
+
+    def _where(self, sql):
+        lines = []
+        for (template, code), times in self.locations[sql].most_common(3):
+            where = ', '.join(part for part in (template and f'template {template}', code) if part)
+            lines.append(f'    {times}x from {where or "unknown location"}')
+        return lines
+
+
+class QueryBudgetMiddleware(HybridMiddleware):
+    """Warn about views over their query budget or repeating a query per row."""
+
+    def handle(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        with QueryRecorder().record() as recorder:
+            response = self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    async def ahandle(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return await self.get_response(request)
+        with QueryRecorder(asyncio.current_task()).record() as recorder:
+            response = await self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    def report(self, request, recorder):
+        match = getattr(request, 'resolver_match', None)
+        problems = recorder.problems(getattr(match.func, 'query_budget', None) if match else None)
+        if problems:
+            view = match.view_name if match else request.path
+            logger.warning('Query budget report for %s %s (%s):\n  %s',
+                           request.method, request.path, view, '\n  '.join(problems))
+
+
+def check_request(client, path, method='get', **kwargs):
+    """
+    Make one test-client request and return ``(response, problems)``.
+
+    ``problems`` lists budget overruns and repeated queries as in the
+    middleware's log. Tests can assert it is empty.
+    """
+    budget = getattr(resolve(path.split('?')[0]).func, 'query_budget', None)
+    recorder = QueryRecorder()
+    with recorder.record():
+        response = getattr(client, method)(path, **kwargs)
+    return response, recorder.problems(budget)
@@ -0,0 +1,101 @@
+"""
+Query-plan guard for the hot queries of the site.
+
+Each entry in HOT_QUERIES builds a queryset in the exact shape a view or
+admin changelist runs it. ``check_plans()`` asks the database to EXPLAIN
+each one and reports those that would read a whole table or sort in a
+temporary structure instead of walking an index:
+
+- PostgreSQL: ``Seq Scan`` nodes, planned with ``enable_seqscan = off`` so
+  that a tiny development table doesn't make a sequential scan look
+  cheaper than an index that does exist.
+- SQLite: ``SCAN <table>`` without ``USING ... INDEX``, and ``USE TEMP
+  B-TREE`` for ORDER BY.
+
+``manage.py check_query_plans`` runs this and exits non-zero on any
+regression, so CI can catch a dropped index or a changed ordering.
+"""
+
+import datetime
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Comment, ContactMessage, Event, PressRelease, Video
+
+SOME_DAY = datetime.date(2025, 1, 1)
+SOME_TIME = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _keyset(queryset, field, value):
+    return queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': 1}))
+
+
+# name -> zero-argument function returning the queryset to check
+HOT_QUERIES = {
+    'event listing': lambda: Event.objects.order_by('-date', '-pk')[:13],
+    'event listing, next page': lambda: _keyset(Event.objects.order_by('-date', '-pk'), 'date', SOME_DAY)[:13],
+    'event detail': lambda: Event.objects.filter(slug='x'),
+    'press listing': lambda: PressRelease.objects.order_by('-date', '-pk')[:13],
+    'press listing, next page': lambda: _keyset(
+        PressRelease.objects.order_by('-date', '-pk'), 'date', SOME_DAY,
+    )[:13],
+    'press detail': lambda: PressRelease.objects.filter(slug='x'),
+    'video listing': lambda: Video.objects.order_by('-created_at', '-pk')[:13],
+    'video listing, next page': lambda: _keyset(
+        Video.objects.order_by('-created_at', '-pk'), 'created_at', SOME_TIME,
+    )[:13],
+    'video detail': lambda: Video.objects.filter(slug='x'),
+    'contact messages, newest first': lambda: ContactMessage.objects.order_by('-created_at', '-pk')[:100],
+    'contact messages by area': lambda: ContactMessage.objects.filter(
+        upazila='lohagara', union='padua',
+    ).order_by('-created_at', '-pk')[:100],
+    'unread contact messages by upazila': lambda: ContactMessage.objects.filter(
+        is_read=False, upazila='lohagara',
+    ).order_by('-created_at', '-pk')[:100],
+    'comments, newest first': lambda: Comment.objects.order_by('-created_at', '-pk')[:100],
+    'comments by area': lambda: Comment.objects.filter(
+        upazila='lohagara', union='padua',
+    ).order_by('-created_at', '-pk')[:100],
+    'unread comments by upazila': lambda: Comment.objects.filter(
+        is_read=False, upazila='lohagara',
+    ).order_by('-created_at', '-pk')[:100],
+    'published comments': lambda: Comment.objects.filter(is_published=True).order_by('-created_at', '-pk')[:100],
+    'published comments, next page': lambda: _keyset(
+        Comment.objects.filter(is_published=True).order_by('-created_at', '-pk'), 'created_at', SOME_TIME,
+    )[:13],
+}
+
+SQLITE_FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+
+
+def explain(queryset):
+    """Return the query plan text for ``queryset`` on the default database"""
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def plan_problems(plan):
+    """Return the reasons a plan counts as a regression, empty if it is fine"""
+    problems = []
+    if connection.vendor == 'postgresql':
+        problems += [f'sequential scan on {table}' for table in re.findall(r'Seq Scan on (\w+)', plan)]
+    elif connection.vendor == 'sqlite':
+        problems += [f'full scan of {table}' for table in SQLITE_FULL_SCAN_RE.findall(plan)]
+        if 'USE TEMP B-TREE' in plan:
+            problems.append('sort without an index')
+    return problems
+
+
+def check_plans():
+    """Return ``{name: (plan, problems)}`` for every hot query"""
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        plan = explain(build())
+        results[name] = (plan, plan_problems(plan))
+    return results
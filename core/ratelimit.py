@@ -0,0 +1,208 @@
+"""
+Per-IP rate limiting for the form and captcha endpoints.
+
+``RateLimitMiddleware`` runs before sessions, CSRF and the views, so a
+request over its limit costs one bucket lookup and a tiny 429 response:
+no session load, no form parsing, no captcha image.
+
+Limits are token buckets implemented as GCRA (generic cell rate
+algorithm). Instead of a token count each bucket stores one timestamp, the
+"theoretical arrival time" (TAT) of the next request if traffic ran exactly
+at the permitted rate. A request is let through when the TAT is at most
+``burst - 1`` intervals ahead of now, and then pushes the TAT one
+interval further.
+
+Backends (``RATELIMIT_BACKEND``):
+
+- ``'local'``: a dict in the worker process. Cheap, but each gunicorn worker
+  enforces its own limit.
+- ``'cache'``: the default cache, shared by all workers. On Redis the update
+  is one atomic Lua script using the server clock; other cache backends use a
+  plain get/set, which is good enough for the per-process locmem cache.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse
+from django.utils.functional import cached_property
+
+from .middleware import HybridMiddleware
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+KEY_PREFIX = 'ratelimit'
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    path: str
+    methods: tuple
+    rate: str
+    burst: int
+
+    @cached_property
+    def interval(self):
+        """Seconds between requests at the sustained rate."""
+        match = RATE_RE.match(self.rate)
+        if not match:
+            raise ValueError(f'Invalid rate {self.rate!r}, expected e.g. "5/m" or "10/10m"')
+        count, multiplier, unit = match.groups()
+        return int(multiplier or 1) * PERIODS[unit] / int(count)
+
+    @cached_property
+    def tolerance(self):
+        return self.interval * (self.burst - 1)
+
+    def matches(self, request):
+        return request.method in self.methods and request.path_info.startswith(self.path)
+
+
+def gcra(tat, now, rule):
+    """
+    Apply one request to a bucket.
+
+    Returns ``(allowed, new_tat, retry_after)``; ``tat`` is None for an
+    empty bucket.
+    """
+    tat = max(tat or now, now)
+    if tat - now > rule.tolerance:
+        return False, tat, tat - rule.tolerance - now
+    return True, tat + rule.interval, 0.0
+
+
+class LocalBackend:
+    """Buckets held in this process only."""
+
+    # Forget buckets that have fully drained once the table grows this large.
+    PRUNE_AT = 10000
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def hit(self, key, rule):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.buckets) >= self.PRUNE_AT:
+                self.buckets = {k: v for k, v in self.buckets.items() if v > now}
+            allowed, tat, retry_after = gcra(self.buckets.get(key), now, rule)
+            self.buckets[key] = tat
+        return allowed, retry_after
+
+
+# KEYS[1] bucket; ARGV interval and tolerance in microseconds.
+# Returns {allowed, retry_after_us}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat - now > tolerance then
+    return {0, tat - tolerance - now}
+end
+tat = tat + interval
+-- Format explicitly: Lua's default number-to-string keeps only 14 digits.
+redis.call('SET', KEYS[1], string.format('%.0f', tat), 'PX', math.ceil((tat - now) / 1000))
+return {1, 0}
+"""
+
+
+class CacheBackend:
+    """Buckets in the default cache, shared by every worker."""
+
+    def _redis_client(self, key):
+        # ``cache`` is a proxy; the backend behind it decides the path.
+        backend = caches[DEFAULT_CACHE_ALIAS]
+        if not isinstance(backend, RedisCache):
+            return None
+        return backend._cache.get_client(key, write=True)
+
+    def hit(self, key, rule):
+        cache_key = cache.make_and_validate_key(key)
+        redis = self._redis_client(cache_key)
+        if redis is not None:
+            allowed, retry_after = redis.eval(
+                GCRA_SCRIPT, 1, cache_key,
+                int(rule.interval * 1e6), int(rule.tolerance * 1e6),
+            )
+            return bool(allowed), retry_after / 1e6
+
+        now = time.time()
+        allowed, tat, retry_after = gcra(cache.get(key), now, rule)
+        if allowed:
+            cache.set(key, tat, timeout=max(int(tat - now) + 1, 1))
+        return allowed, retry_after
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'cache': CacheBackend,
+}
+
+
+def client_ip(request):
+    """
+    Return the client address used as the bucket key.
+
+    Behind nginx every request arrives from the proxy, so the address is
+    read from RATELIMIT_IP_HEADER (e.g. X-Real-IP) when it is configured.
+    """
+    if settings.RATELIMIT_IP_HEADER:
+        ip = request.headers.get(settings.RATELIMIT_IP_HEADER, '').split(',')[0].strip()
+        if ip:
+            return ip
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class RateLimitMiddleware(HybridMiddleware):
+    """Reject requests over their rule's limit with 429 Too Many Requests."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.rules = [Rule(*rule) for rule in settings.RATELIMIT_RULES]
+        self.backend = BACKENDS[settings.RATELIMIT_BACKEND]()
+
+    def bucket(self, request):
+        """The bucket key and matching rule, or None if no rule applies"""
+        if settings.RATELIMIT_ENABLED:
+            for rule in self.rules:
+                if rule.matches(request):
+                    return f'{KEY_PREFIX}:{rule.name}:{client_ip(request)}', rule
+        return None
+
+    def handle(self, request):
+        bucket = self.bucket(request)
+        if bucket is not None:
+            allowed, retry_after = self.backend.hit(*bucket)
+            if not allowed:
+                return self.too_many_requests(retry_after)
+        return self.get_response(request)
+
+    async def ahandle(self, request):
+        bucket = self.bucket(request)
+        if bucket is not None:
+            # The cache backend blocks on Redis; keep it off the event loop.
+            allowed, retry_after = await sync_to_async(self.backend.hit)(*bucket)
+            if not allowed:
+                return self.too_many_requests(retry_after)
+        return await self.get_response(request)
+
+    def too_many_requests(self, retry_after):
+        response = HttpResponse(
+            'অনেক বেশি অনুরোধ পাঠানো হয়েছে। অনুগ্রহ করে কিছুক্ষণ পরে আবার চেষ্টা করুন।',
+            status=429,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = max(int(retry_after + 0.999), 1)
+        return response
@@ -0,0 +1,210 @@
+"""
+Rating statistics for published comments.
+
+CommentRatingSummary keeps one row of running totals per (upazila, union,
+category). Instead of a GROUP BY over every comment on each page view,
+the totals are adjusted whenever a comment enters or leaves the published
+set, or is edited or deleted while published. A change becomes a
+subtraction from the old group and an addition to the new one, applied
+with F() expressions so concurrent updates don't lose counts. The public
+feed folds the few hundred summary rows into per-upazila, per-union and
+per-category figures in Python.
+
+Bulk publishing from the admin goes through ``set_published()``, which
+locks the rows it flips, then updates them in batched UPDATEs and the
+totals from a GROUP BY over the same rows. ``manage.py
+rebuild_rating_summary`` recomputes everything from scratch after other
+changes made behind the ORM's back (raw SQL, QuerySet.update()).
+"""
+
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .cache import bump_content_version
+from .db_router import note_content_write
+from .models import Comment, CommentRatingSummary
+
+STATE_FIELDS = ('is_published', 'upazila', 'union', 'category', 'rating')
+RATINGS = (1, 2, 3, 4, 5)
+TOTAL_FIELDS = ('count', 'rated_count', 'rating_sum') + tuple(f'rating_{rating}' for rating in RATINGS)
+# Primary keys per UPDATE in set_published(), well below SQLite's variable limit.
+PUBLISH_BATCH_SIZE = 1000
+
+
+def state_of(comment):
+    """The fields of a comment that decide where and how it is counted"""
+    return {field: getattr(comment, field) for field in STATE_FIELDS}
+
+
+def stored_state(pk):
+    """The counted fields of a comment as currently saved, or None"""
+    if pk is None:
+        return None
+    return Comment.objects.filter(pk=pk).values(*STATE_FIELDS).first()
+
+
+def contribution(state):
+    """Return ``(group, increments)`` for a published comment state, else None"""
+    if not state or not state['is_published']:
+        return None
+    group = (state['upazila'], state['union'], state['category'])
+    increments = {'count': 1}
+    rating = state['rating']
+    if rating in RATINGS:
+        increments.update({'rated_count': 1, 'rating_sum': rating, f'rating_{rating}': 1})
+    return group, increments
+
+
+def apply_changes(changes):
+    """
+    Apply ``[(old_state, new_state), ...]`` to the summary table.
+
+    Deltas are merged per group first, so publishing a thousand comments
+    costs one UPDATE per affected group. Returns True if anything changed.
+    """
+    deltas = defaultdict(Counter)
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            counted = contribution(state)
+            if counted:
+                group, increments = counted
+                for field, value in increments.items():
+                    deltas[group][field] += sign * value
+
+    return _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    deltas = {group: delta for group, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return False
+    with transaction.atomic():
+        for (upazila, union, category), delta in deltas.items():
+            lookup = {'upazila': upazila, 'union': union, 'category': category}
+            CommentRatingSummary.objects.get_or_create(**lookup)
+            CommentRatingSummary.objects.filter(**lookup).update(
+                **{field: F(field) + value for field, value in delta.items() if value}
+            )
+    return True
+
+
+def published_changed():
+    """Retire cached feed pages once a change to the published set or its totals commits"""
+    transaction.on_commit(partial(bump_content_version, Comment))
+    note_content_write()
+
+
+def set_published(comments, published):
+    """
+    Publish or unpublish every comment in a queryset in a few UPDATEs.
+
+    Only rows whose flag actually flips are counted, and the totals are
+    adjusted from a GROUP BY over those rows, so only primary keys are
+    loaded into Python. Returns the number of comments changed.
+    """
+    changing = comments.filter(is_published=not published).order_by()
+    sign = 1 if published else -1
+    changed = 0
+    deltas = defaultdict(Counter)
+    with transaction.atomic():
+        # Lock the rows first: a concurrent call waits here, then sees only
+        # the rows still left to flip, so no comment is counted twice.
+        pks = list(changing.select_for_update().values_list('pk', flat=True))
+        for start in range(0, len(pks), PUBLISH_BATCH_SIZE):
+            batch = changing.filter(pk__in=pks[start:start + PUBLISH_BATCH_SIZE])
+            for row in _group_totals(batch):
+                group = (row['upazila'], row['union'], row['category'])
+                for field in TOTAL_FIELDS:
+                    deltas[group][field] += sign * row[field]
+            changed += batch.update(is_published=published)
+        _apply_deltas(deltas)
+    if changed:
+        published_changed()
+    return changed
+
+
+def _group_totals(comments):
+    return comments.values('upazila', 'union', 'category').annotate(
+        count=Count('id'),
+        rated_count=Count('rating', filter=Q(rating__in=RATINGS)),
+        rating_sum=Coalesce(Sum('rating', filter=Q(rating__in=RATINGS)), 0),
+        **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in RATINGS},
+    ).order_by()
+
+
+def aggregate_rows(comments):
+    """GROUP BY a comment queryset into summary row values (used by rebuilds)"""
+    return _group_totals(comments.filter(is_published=True))
+
+
+def rebuild():
+    """Recompute the summary table from the comments; returns the group count"""
+    rows = [CommentRatingSummary(**row) for row in aggregate_rows(Comment.objects.all())]
+    with transaction.atomic():
+        CommentRatingSummary.objects.all().delete()
+        CommentRatingSummary.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _totals(rows):
+    count = sum(row.count for row in rows)
+    rated = sum(row.rated_count for row in rows)
+    rating_sum = sum(row.rating_sum for row in rows)
+    distribution = []
+    for rating in reversed(RATINGS):
+        n = sum(getattr(row, f'rating_{rating}') for row in rows)
+        distribution.append({
+            'rating': rating,
+            'count': n,
+            'percent': round(100 * n / rated) if rated else 0,
+        })
+    return {
+        'count': count,
+        'rated_count': rated,
+        'mean': round(rating_sum / rated, 2) if rated else None,
+        'distribution': distribution,
+    }
+
+
+def statistics():
+    """
+    Return overall figures plus breakdowns by upazila, union and category.
+
+    Each breakdown is a list of dicts with ``label``, ``count``,
+    ``rated_count``, ``mean`` and a five-to-one star ``distribution``.
+    """
+    return _summarise(list(CommentRatingSummary.objects.filter(count__gt=0)))
+
+
+async def astatistics():
+    """Async version of statistics(), for async views"""
+    return _summarise([row async for row in CommentRatingSummary.objects.filter(count__gt=0)])
+
+
+def _summarise(rows):
+    upazilas = dict(Comment.UPAZILA_CHOICES)
+    unions = dict(Comment.UNION_CHOICES)
+    categories = dict(Comment.CATEGORY_CHOICES)
+
+    def breakdown(key, labels):
+        groups = defaultdict(list)
+        for row in rows:
+            value = key(row)
+            if value:
+                groups[value].append(row)
+        result = [
+            {'key': value, 'label': labels.get(value, value), **_totals(members)}
+            for value, members in groups.items()
+        ]
+        return sorted(result, key=lambda item: -item['count'])
+
+    return {
+        'overall': _totals(rows),
+        'by_upazila': breakdown(lambda row: row.upazila, upazilas),
+        'by_union': breakdown(lambda row: row.union, unions),
+        'by_category': breakdown(lambda row: row.category, categories),
+    }
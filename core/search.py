@@ -0,0 +1,280 @@
+"""
+Full-text search over events, press releases and videos.
+
+Each content object has one SearchDocument row holding its text already
+split into lowercase tokens, using the same notion of a "word" as
+custom_slugify (Latin word characters plus the whole Bangla block, so
+vowel signs and virama stay inside words). The database then only has to
+index whitespace-separated tokens, which keeps both backends consistent:
+
+- PostgreSQL: a weighted ``tsvector`` (title A, body B) built with the
+  ``simple`` configuration, behind a GIN index. Ranked with ts_rank.
+- SQLite: an FTS5 table with the ``ascii`` tokenizer, which treats every
+  non-ASCII character as part of a word, keyed by the document id.
+  Ranked with bm25().
+- Anything else falls back to ``icontains`` on the token text.
+
+Documents are refreshed from post_save/post_delete (core/signals.py) and
+can be rebuilt with ``manage.py rebuild_search_index``.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Event, PressRelease, SearchDocument, Video
+
+TOKEN_RE = re.compile(r'[\u0980-\u09ff\w]+')
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+# kind -> (model, title field, body fields)
+SOURCES = {
+    'event': (Event, 'title', ['description', 'location']),
+    'press': (PressRelease, 'title', ['summary', 'content', 'category']),
+    'video': (Video, 'title', []),
+}
+
+KIND_FOR_MODEL = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+
+def tokenize(value):
+    """Split text into lowercase word tokens, keeping Bangla words whole"""
+    return TOKEN_RE.findall((value or '').lower())
+
+
+def document_fields(kind, obj):
+    """Return the normalised (title, body) text for one content object"""
+    _, title_field, body_fields = SOURCES[kind]
+    title = ' '.join(tokenize(getattr(obj, title_field)))
+    body = ' '.join(tokenize(' '.join(str(getattr(obj, f) or '') for f in body_fields)))
+    return title, body
+
+
+def sync_backend(documents, using=None):
+    """
+    Refresh the vendor-specific index for the given SearchDocument rows.
+
+    Takes plain model instances (or historical ones from a migration) with
+    ``pk``, ``title`` and ``body`` loaded.
+    """
+    conn = connection if using is None else using
+    ids = [doc.pk for doc in documents]
+    if not ids:
+        return
+    if conn.vendor == 'postgresql':
+        type(documents[0]).objects.filter(pk__in=ids).update(
+            search_vector=(
+                SearchVector('title', weight='A', config='simple')
+                + SearchVector('body', weight='B', config='simple')
+            )
+        )
+    elif conn.vendor == 'sqlite':
+        with conn.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [(doc.pk, doc.title, doc.body) for doc in documents],
+            )
+
+
+def index_object(obj):
+    """Create or refresh the search document of a saved content object"""
+    kind = KIND_FOR_MODEL[type(obj)]
+    title, body = document_fields(kind, obj)
+    doc, _ = SearchDocument.objects.update_or_create(
+        kind=kind, object_id=obj.pk, defaults={'title': title, 'body': body},
+    )
+    sync_backend([doc])
+
+
+def remove_object(obj):
+    """Drop the search document of a deleted content object"""
+    kind = KIND_FOR_MODEL[type(obj)]
+    ids = list(SearchDocument.objects.filter(kind=kind, object_id=obj.pk).values_list('pk', flat=True))
+    if ids and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+    SearchDocument.objects.filter(pk__in=ids).delete()
+
+
+def rebuild(batch_size=500):
+    """Re-index every content object and return the number of documents"""
+    total = 0
+    SearchDocument.objects.all().delete()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    for kind, (model, title_field, body_fields) in SOURCES.items():
+        batch = []
+        objects = model.objects.only('pk', title_field, *body_fields).iterator(chunk_size=batch_size)
+        for obj in objects:
+            title, body = document_fields(kind, obj)
+            batch.append(SearchDocument(kind=kind, object_id=obj.pk, title=title, body=body))
+            if len(batch) >= batch_size:
+                total += _insert(batch)
+                batch = []
+        total += _insert(batch)
+    return total
+
+
+def _insert(batch):
+    if not batch:
+        return 0
+    # bulk_create only returns primary keys on some backends, so re-read them.
+    SearchDocument.objects.bulk_create(batch)
+    kind = batch[0].kind
+    documents = list(
+        SearchDocument.objects.filter(kind=kind, object_id__in=[d.object_id for d in batch])
+        .only('pk', 'title', 'body')
+    )
+    sync_backend(documents)
+    return len(documents)
+
+
+def _matching(kind, tokens, ranked=False):
+    """
+    Return a queryset of SearchDocuments matching every token (as a prefix).
+
+    With ``ranked`` the rows are annotated with ``rank``, higher is better.
+    Unranked querysets are safe to use as subqueries.
+    """
+    documents = SearchDocument.objects.all()
+    if kind:
+        documents = documents.filter(kind=kind)
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config='simple')
+        documents = documents.filter(search_vector=query)
+        if ranked:
+            documents = documents.annotate(rank=SearchRank(F('search_vector'), query))
+        return documents
+
+    if connection.vendor == 'sqlite':
+        match = ' AND '.join(f'"{token}"*' for token in tokens)
+        if ranked:
+            # bm25() is lower-is-better; negate it so both backends sort alike.
+            return documents.extra(
+                tables=[FTS_TABLE],
+                where=[f'{FTS_TABLE}.rowid = core_searchdocument.id', f'{FTS_TABLE} MATCH %s'],
+                params=[match],
+                select={'rank': f'-bm25({FTS_TABLE}, 10.0, 1.0)'},
+            )
+        return documents.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+
+    for token in tokens:
+        documents = documents.filter(Q(title__icontains=token) | Q(body__icontains=token))
+    if ranked:
+        documents = documents.annotate(rank=Value(1.0))
+    return documents
+
+
+def search(query, kind=None, limit=30):
+    """
+    Run a public search and return result dicts, best match first.
+
+    Each result has ``kind``, its display ``label``, the content ``object``
+    and a highlighted ``title`` and ``snippet``.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    hits = list(_ranked_hits(kind, tokens, limit))
+    objects = {
+        hit_kind: SOURCES[hit_kind][0].objects.in_bulk(pks)
+        for hit_kind, pks in _pks_by_kind(hits).items()
+    }
+    return _results(hits, objects, tokens)
+
+
+async def asearch(query, kind=None, limit=30):
+    """Async version of search(), for async views"""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    hits = [hit async for hit in _ranked_hits(kind, tokens, limit)]
+    objects = {
+        hit_kind: await SOURCES[hit_kind][0].objects.ain_bulk(pks)
+        for hit_kind, pks in _pks_by_kind(hits).items()
+    }
+    return _results(hits, objects, tokens)
+
+
+def _ranked_hits(kind, tokens, limit):
+    return _matching(kind, tokens, ranked=True).order_by('-rank', '-pk').values_list('kind', 'object_id')[:limit]
+
+
+def _pks_by_kind(hits):
+    pks = {}
+    for hit_kind, object_id in hits:
+        pks.setdefault(hit_kind, []).append(object_id)
+    return pks
+
+
+def _results(hits, objects, tokens):
+    results = []
+    for hit_kind, object_id in hits:
+        obj = objects[hit_kind].get(object_id)
+        if obj is None:
+            continue
+        _, title_field, body_fields = SOURCES[hit_kind]
+        text = ' '.join(str(getattr(obj, f) or '') for f in body_fields) or getattr(obj, title_field)
+        results.append({
+            'kind': hit_kind,
+            'label': dict(SearchDocument.KIND_CHOICES)[hit_kind],
+            'object': obj,
+            'title': highlight(getattr(obj, title_field), tokens, words=None),
+            'snippet': highlight(text, tokens),
+        })
+    return results
+
+
+def matching_ids(kind, query):
+    """
+    Return a subquery of object ids of ``kind`` matching ``query``, or None
+    when the query has no searchable tokens. Used by the admin changelists.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    return _matching(kind, tokens).values('object_id')
+
+
+def highlight(text, tokens, words=30):
+    """
+    Escape ``text`` and wrap words starting with any query token in <mark>.
+
+    With ``words`` set, only a window of that many words around the first
+    match is returned, with ellipses where text was cut.
+    """
+    parts = re.split(r'(\s+)', text or '')
+    words_only = parts[::2]
+    marked = []
+    first_match = None
+    for index, word in enumerate(words_only):
+        lowered = ''.join(tokenize(word))
+        if lowered and any(lowered.startswith(token) for token in tokens):
+            marked.append(f'<mark>{escape(word)}</mark>')
+            if first_match is None:
+                first_match = index
+        else:
+            marked.append(escape(word))
+
+    if words is None or len(marked) <= words:
+        return mark_safe(' '.join(w for w in marked if w))
+
+    start = max((first_match or 0) - words // 3, 0)
+    end = start + words
+    snippet = ' '.join(w for w in marked[start:end] if w)
+    if start > 0:
+        snippet = '… ' + snippet
+    if end < len(marked):
+        snippet += ' …'
+    return mark_safe(snippet)
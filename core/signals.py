@@ -0,0 +1,71 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import ratings, search, sitemap_cache
+from .cache import bump_content_version
+from .models import Comment, Event, PressRelease, Video
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=PressRelease)
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=PressRelease)
+@receiver(post_delete, sender=Video)
+def invalidate_content_pages(sender, using=None, **kwargs):
+    """
+    Drop cached pages that render the saved or deleted model.
+
+    Saves from the admin and UniqueSlugMixin run inside a transaction. Bumping
+    before the commit would let a concurrent request cache the old row under
+    the new version, so the bump waits for the commit.
+    """
+    transaction.on_commit(partial(bump_content_version, sender), using=using)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=PressRelease)
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=PressRelease)
+@receiver(post_delete, sender=Video)
+def invalidate_sitemap(sender, using=None, **kwargs):
+    """Rebuild the sitemap section of the saved or deleted model on next hit."""
+    transaction.on_commit(partial(sitemap_cache.invalidate_model, sender), using=using)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=PressRelease)
+@receiver(post_save, sender=Video)
+def update_search_document(sender, instance, **kwargs):
+    """Keep the search index in step with saved content."""
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=PressRelease)
+@receiver(post_delete, sender=Video)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    """Keep the saved state so post_save can tell what changed."""
+    instance._stored_state = None if raw else ratings.stored_state(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def update_rating_summary(sender, instance, signal, **kwargs):
+    """Adjust rating totals and the published feed when a comment enters, leaves or changes in it."""
+    if signal is post_delete:
+        old, new = ratings.state_of(instance), None
+    else:
+        old, new = getattr(instance, '_stored_state', None), ratings.state_of(instance)
+    if (old and old['is_published']) or (new and new['is_published']):
+        ratings.apply_changes([(old, new)])
+        ratings.published_changed()
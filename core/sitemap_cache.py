@@ -0,0 +1,170 @@
+"""
+Pre-generated sitemap files.
+
+Instead of rendering every URL on each crawler hit, the sitemap is written
+to SITEMAP_ROOT as a sitemap index plus one file per section page::
+
+    sitemap.xml                  -> index of the files below
+    sitemap-static-1.xml
+    sitemap-events-1.xml         -> at most Sitemap.limit URLs each
+    sitemap-events-2.xml
+    ...
+
+Files are built on first request (or up front with ``manage.py
+build_sitemaps``) and served with ETag/Last-Modified so unchanged files cost
+crawlers a 304. Saving or deleting content removes only the affected
+section's files and the index, which are rebuilt on the next hit.
+"""
+
+import glob
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .cache import content_versions
+from .models import Event, PressRelease, Video
+from .sitemaps import SITEMAPS
+
+# Content model behind each dynamic section; 'static' has none.
+SECTION_MODELS = {
+    'events': Event,
+    'press': PressRelease,
+    'videos': Video,
+}
+
+
+class SitemapSite:
+    """Stand-in for a Site object: sitemaps only need ``.domain``."""
+
+    def __init__(self, domain):
+        self.domain = domain
+
+
+def _site():
+    return SitemapSite(settings.SITEMAP_DOMAIN)
+
+
+def _base_url():
+    return f'{settings.SITEMAP_PROTOCOL}://{settings.SITEMAP_DOMAIN}'
+
+
+def index_path():
+    return os.path.join(settings.SITEMAP_ROOT, 'sitemap.xml')
+
+
+def section_path(section, page):
+    return os.path.join(settings.SITEMAP_ROOT, f'sitemap-{section}-{page}.xml')
+
+
+def _section_files(section):
+    return glob.glob(os.path.join(settings.SITEMAP_ROOT, f'sitemap-{section}-*.xml'))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write(path, content):
+    """Write atomically so readers never see a half-written file."""
+    os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.SITEMAP_ROOT, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def build_section(section):
+    """Render every page of one section to disk and return the page count."""
+    model = SECTION_MODELS.get(section)
+    versions = content_versions(model) if model else None
+
+    sitemap = SITEMAPS[section]()
+    pages = list(sitemap.paginator.page_range)
+    written = set()
+    for page in pages:
+        urls = sitemap.get_urls(page=page, site=_site(), protocol=settings.SITEMAP_PROTOCOL)
+        path = section_path(section, page)
+        _write(path, render_to_string('sitemap.xml', {'urlset': urls}))
+        written.add(path)
+
+    for path in _section_files(section):
+        if path not in written:
+            _remove(path)
+
+    # Content changed while we were rendering: drop what we wrote so the
+    # next request rebuilds from the new data instead of serving it stale.
+    if model and content_versions(model) != versions:
+        invalidate_section(section)
+    return len(pages)
+
+
+def build_index():
+    """Render the sitemap index, building any section that is missing."""
+    entries = []
+    for section in SITEMAPS:
+        pages = len(_section_files(section)) or build_section(section)
+        for page in range(1, pages + 1):
+            location = _base_url() + reverse('sitemap_section', args=[section, page])
+            entries.append({'location': location})
+    _write(index_path(), render_to_string('sitemap_index.xml', {'sitemaps': entries}))
+
+
+def build_all():
+    """Rebuild every section and the index from scratch."""
+    counts = {section: build_section(section) for section in SITEMAPS}
+    build_index()
+    return counts
+
+
+def invalidate_section(section):
+    """Remove a section's files and the index so both are rebuilt lazily."""
+    for path in _section_files(section) + [index_path()]:
+        _remove(path)
+
+
+def invalidate_model(model):
+    for section, section_model in SECTION_MODELS.items():
+        if section_model is model:
+            invalidate_section(section)
+
+
+def ensure_index():
+    """Return the index path, building it first if needed."""
+    path = index_path()
+    if not os.path.exists(path):
+        build_index()
+    return path
+
+
+async def aensure_index():
+    """Async ensure_index(): the build, if needed, runs in a worker thread."""
+    path = index_path()
+    if not os.path.exists(path):
+        await sync_to_async(build_index)()
+    return path
+
+
+def ensure_section(section, page):
+    """Return the path of one section page, or None if it doesn't exist."""
+    path = section_path(section, page)
+    # Only rebuild a section that has no files at all; requests for pages
+    # past the end must not trigger a rebuild each time.
+    if not os.path.exists(path) and not _section_files(section):
+        build_section(section)
+    return path if os.path.exists(path) else None
+
+
+async def aensure_section(section, page):
+    """Async ensure_section(): the build, if needed, runs in a worker thread."""
+    path = section_path(section, page)
+    if not os.path.exists(path) and not _section_files(section):
+        await sync_to_async(build_section)(section)
+    return path if os.path.exists(path) else None
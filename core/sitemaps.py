@@ -17,6 +17,11 @@ from django.urls import reverse
 from .models import Event, PressRelease, Video
 
 
+# Maximum URLs per generated sitemap file (the protocol allows 50,000).
+# Smaller files are cheaper to rebuild when a single section changes.
+SITEMAP_PAGE_SIZE = 5000
+
+
 class StaticViewSitemap(Sitemap):
     """
     Sitemap for static pages (home, about, contact, etc.)
@@ -103,22 +108,24 @@ class EventSitemap(Sitemap):
     - Medium priority (0.6) - detail pages
     """
     changefreq = 'weekly'
+    limit = SITEMAP_PAGE_SIZE
     priority = 0.6
     
     def items(self):
         """
         Return all Event objects.
         Ordered by date (newest first) for better crawl priority.
+        Only the columns used for <loc>/<lastmod> are loaded.
         """
-        return Event.objects.all().order_by('-date')
+        return Event.objects.only('slug', 'updated_at').order_by('-date', '-pk')
     
     def lastmod(self, obj):
         """
-        Return last modification date.
-        Uses event date as proxy for modification.
+        Return last modification time.
+        Tracked by Event.updated_at, so edits are re-crawled.
         This helps search engines prioritize recent content.
         """
-        return obj.date
+        return obj.updated_at
     
     def location(self, obj):
         """
@@ -139,21 +146,23 @@ class PressReleaseSitemap(Sitemap):
     - Includes publication date
     """
     changefreq = 'weekly'
+    limit = SITEMAP_PAGE_SIZE
     priority = 0.7
     
     def items(self):
         """
         Return all PressRelease objects.
         Ordered by date (newest first).
+        Only the columns used for <loc>/<lastmod> are loaded.
         """
-        return PressRelease.objects.all().order_by('-date')
+        return PressRelease.objects.only('slug', 'updated_at').order_by('-date', '-pk')
     
     def lastmod(self, obj):
         """
-        Return publication date as last modification.
+        Return last modification time (PressRelease.updated_at).
         Helps search engines prioritize recent news.
         """
-        return obj.date
+        return obj.updated_at
     
     def location(self, obj):
         """
@@ -174,21 +183,23 @@ class VideoSitemap(Sitemap):
     - Includes creation timestamp
     """
     changefreq = 'weekly'
+    limit = SITEMAP_PAGE_SIZE
     priority = 0.6
     
     def items(self):
         """
         Return all Video objects.
         Ordered by creation date (newest first).
+        Only the columns used for <loc>/<lastmod> are loaded.
         """
-        return Video.objects.all().order_by('-created_at')
+        return Video.objects.only('slug', 'updated_at').order_by('-created_at', '-pk')
     
     def lastmod(self, obj):
         """
-        Return creation date as last modification.
+        Return last modification time (Video.updated_at).
         Videos typically don't change after creation.
         """
-        return obj.created_at
+        return obj.updated_at
     
     def location(self, obj):
         """
@@ -198,25 +209,11 @@ class VideoSitemap(Sitemap):
         return reverse('video_detail', args=[obj.slug])
 
 
-# ==============================================================================
-# ADVANCED: Pagination for Large Datasets
-# ==============================================================================
-# If you have more than 50,000 URLs in a single sitemap, use pagination:
-#
-# class LargePressReleaseSitemap(Sitemap):
-#     changefreq = 'weekly'
-#     priority = 0.7
-#     limit = 50000  # Maximum URLs per sitemap file
-#     
-#     def items(self):
-#         return PressRelease.objects.all().order_by('-date')
-#     
-#     def lastmod(self, obj):
-#         return obj.date
-#
-# Django will automatically create:
-# - /sitemap.xml (index file)
-# - /sitemap-pressrelease-1.xml
-# - /sitemap-pressrelease-2.xml
-# - etc.
-# ==============================================================================
+# Sections of the generated sitemap (see core/sitemap_cache.py). The keys
+# appear in file names: sitemap-<section>-<page>.xml
+SITEMAPS = {
+    'static': StaticViewSitemap,        # Static pages (home, about, etc.)
+    'events': EventSitemap,             # Event detail pages
+    'press': PressReleaseSitemap,       # Press release detail pages
+    'videos': VideoSitemap,             # Video detail pages
+}
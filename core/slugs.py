@@ -0,0 +1,124 @@
+"""
+Unique slugs for the content models.
+
+A title's slug is ``custom_slugify(title)``. When that is taken, the
+number after the highest one in use is appended (``title-1``,
+``title-2``, ...). The slugs in use are found with one query for every
+slug starting with the base (a prefix range on the unique slug index)
+rather than one ``exists()`` per suffix.
+
+``UniqueSlugMixin.save()`` allocates and inserts while holding a
+per-table lock (a transaction-scoped advisory lock on PostgreSQL), so two
+admins saving the same title at once get different slugs instead of an
+IntegrityError. ``fill_missing()`` backs ``manage.py populate_slugs``
+(the 0004 data migration keeps a frozen copy): it only touches rows
+without a slug, so it can be re-run at any time.
+"""
+
+import hashlib
+import re
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+# Room kept at the end of max_length for the "-<n>" suffix.
+SUFFIX_ROOM = 10
+
+
+def custom_slugify(value):
+    # Keep Bangla characters, alphanumeric, and hyphens
+    value = re.sub(r'[^\u0980-\u09ff\w\s-]', '', value)
+    return re.sub(r'[-\s]+', '-', value).strip('-')
+
+
+class SlugAllocator:
+    """
+    Hand out unique slugs for one model.
+
+    Slugs handed out earlier are remembered, so a batch can allocate many
+    slugs before saving any of them. Use a fresh allocator per transaction.
+    """
+
+    def __init__(self, model, using='default', field='slug'):
+        self.queryset = model._default_manager.using(using)
+        self.field = field
+        self.max_length = model._meta.get_field(field).max_length
+        self.fallback = model._meta.model_name
+        self.used = {}
+
+    def base(self, title):
+        return custom_slugify(title or '')[:self.max_length - SUFFIX_ROOM].strip('-') or self.fallback
+
+    def _used_suffixes(self, base, exclude_pk):
+        taken = self.queryset.filter(
+            Q(**{self.field: base}) | Q(**{f'{self.field}__startswith': f'{base}-'})
+        )
+        if exclude_pk is not None:
+            taken = taken.exclude(pk=exclude_pk)
+        suffix_re = re.compile(rf'^{re.escape(base)}-(\d+)$')
+        used = set()
+        for slug in taken.values_list(self.field, flat=True):
+            if slug == base:
+                used.add(0)
+            elif match := suffix_re.match(slug):
+                used.add(int(match.group(1)))
+        return used
+
+    def allocate(self, title, exclude_pk=None):
+        base = self.base(title)
+        if base not in self.used:
+            self.used[base] = self._used_suffixes(base, exclude_pk)
+        used = self.used[base]
+        # The bare base when it is free, else one past the highest number.
+        suffix = 0 if 0 not in used else max(used) + 1
+        used.add(suffix)
+        return f'{base}-{suffix}' if suffix else base
+
+
+def _lock_key(model):
+    digest = hashlib.blake2b(f'slug:{model._meta.label_lower}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@contextmanager
+def allocation_lock(model, using):
+    """
+    Serialise slug allocation for ``model`` until the surrounding
+    transaction ends. Other databases rely on their own write locking.
+    """
+    with transaction.atomic(using=using):
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_lock_key(model)])
+        yield
+
+
+class UniqueSlugMixin:
+    """Give a model with ``title`` and ``slug`` fields a unique slug on first save."""
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+        model = type(self)
+        using = kwargs.get('using') or router.db_for_write(model, instance=self)
+        with allocation_lock(model, using):
+            self.slug = SlugAllocator(model, using).allocate(self.title, exclude_pk=self.pk)
+            return super().save(*args, **kwargs)
+
+
+def fill_missing(model, batch_size=500, using='default'):
+    """Give every row of ``model`` without a slug one; returns the number filled"""
+    filled = 0
+    missing = model._default_manager.using(using).filter(Q(slug__isnull=True) | Q(slug='')).order_by('pk')
+    while True:
+        with allocation_lock(model, using):
+            batch = list(missing.only('pk', 'title')[:batch_size])
+            if not batch:
+                return filled
+            allocator = SlugAllocator(model, using)
+            for obj in batch:
+                obj.slug = allocator.allocate(obj.title, exclude_pk=obj.pk)
+            model._default_manager.using(using).bulk_update(batch, ['slug'])
+        filled += len(batch)
@@ -0,0 +1,49 @@
+"""
+Compile every project template ahead of the first request.
+
+With the cached loader each worker parses a template the first time it is
+rendered and keeps the compiled result for the life of the process, so a
+freshly started worker pays that parse cost on its first requests.
+``warm_templates()`` runs from the WSGI and ASGI entry points (when
+TEMPLATE_WARMUP is on) and loads every file under the engine's DIRS into the cache up
+front. ``manage.py check_templates`` uses the same walk to fail a build on
+any template that doesn't compile.
+"""
+
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Yield every template name under the engine's DIRS, e.g. 'includes/event_card.html'"""
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def compile_templates():
+    """Load every project template; return (compiled names, {name: error})"""
+    engine = engines['django'].engine
+    compiled = []
+    errors = {}
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, UnicodeDecodeError) as exc:
+            errors[name] = exc
+        else:
+            compiled.append(name)
+    return compiled, errors
+
+
+def warm_templates():
+    compiled, errors = compile_templates()
+    for name, exc in errors.items():
+        logger.error('Template %s failed to compile: %s', name, exc)
+    logger.info('Compiled %d template(s) at startup', len(compiled))
@@ -1,22 +1,18 @@
 from django import template
-import re
+
+from core.models import extract_youtube_id
 
 register = template.Library()
 
 @register.filter
-def youtube_id(url):
+def youtube_id(value):
     """
-    Extract YouTube video ID from various URL formats:
-    - https://www.youtube.com/watch?v=VIDEO_ID
-    - https://youtu.be/VIDEO_ID
-    - https://www.youtube.com/embed/VIDEO_ID
+    Return the YouTube video ID for a Video or a YouTube URL.
+
+    Videos carry the ID precomputed on save, so no regex runs for them.
+    Plain URLs in any of the formats handled by extract_youtube_id()
+    are still parsed on the fly.
     """
-    if not url:
-        return ''
-    
-    # Pattern for watch?v= format
-    match = re.search(r'(?:v=|/)([0-9A-Za-z_-]{11}).*', url)
-    if match:
-        return match.group(1)
-    
-    return ''
+    if hasattr(value, 'youtube_id'):
+        return value.youtube_id
+    return extract_youtube_id(value)
@@ -1,3 +1,759 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from captcha.models import CaptchaStore
+from django import forms
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import Http404
+from django.template.loader import get_template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from . import (
+    captcha_pool, db_router, ingest, metrics, profiling, ratelimit, ratings, search, sitemap_cache, views,
+)
+from .cache import SITE_VERSION_KEY, bump_site_version, content_versions, site_version
+from .forms import CommentForm, ContactForm, pooled_captcha_field
+from .images import VARIANT_FORMATS, variant_name
+from .media import serve_media
+from .models import Comment, ContactMessage, Event, PressRelease, Video
+from .pagination import encode_cursor, paginate_keyset
+from .query_budget import check_request
+from .query_plans import check_plans
+from .sitemaps import SITEMAPS
+from .slugs import SlugAllocator
+
+
+def make_event(title='Rally', **kwargs):
+    return Event.objects.create(
+        title=title,
+        date=kwargs.pop('date', datetime.date(2025, 1, 1)),
+        location=kwargs.pop('location', 'Dhaka'),
+        description=kwargs.pop('description', 'Description'),
+        **kwargs,
+    )
+
+
+class PageCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_moves_only_after_commit(self):
+        before = content_versions(Event)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_event()
+            self.assertEqual(content_versions(Event), before)
+        self.assertNotEqual(content_versions(Event), before)
+
+
+class KeysetPaginationTests(TestCase):
+    def test_pages_follow_the_cursor(self):
+        for day in range(1, 6):
+            make_event(f'Event {day}', date=datetime.date(2025, 1, day))
+        first = paginate_keyset(Event.objects.all(), 'date', per_page=2)
+        second = paginate_keyset(Event.objects.all(), 'date', first.next_cursor, per_page=2)
+        last = paginate_keyset(Event.objects.all(), 'date', second.next_cursor, per_page=2)
+        self.assertEqual([e.title for e in first], ['Event 5', 'Event 4'])
+        self.assertEqual([e.title for e in second], ['Event 3', 'Event 2'])
+        self.assertEqual([e.title for e in last], ['Event 1'])
+        self.assertFalse(last.has_next)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ('not-a-cursor', encode_cursor(datetime.date(2025, 1, 1), 1)[:-3]):
+            response = self.client.get('/events/', {'after': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+def image_upload(name, width, height=100):
+    out = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(out, 'JPEG')
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def variant_files(self, event):
+        storage = event.image.storage
+        return {
+            variant_name(event.image.name, width, spec[2])
+            for width in event.image_widths for spec in VARIANT_FORMATS
+            if storage.exists(variant_name(event.image.name, width, spec[2]))
+        }
+
+    def test_small_image_gets_a_variant_at_its_own_width(self):
+        event = make_event(image=image_upload('small.jpg', 300))
+        self.assertEqual(event.image_widths, [300])
+        self.assertEqual(len(self.variant_files(event)), len(VARIANT_FORMATS))
+
+    def test_large_image_is_capped_at_the_largest_width(self):
+        event = make_event(image=image_upload('large.jpg', 3000))
+        self.assertEqual(event.image_widths, [400, 800, 1200])
+        self.assertEqual(len(self.variant_files(event)), 3 * len(VARIANT_FORMATS))
+
+    def test_replacing_the_image_deletes_old_variants(self):
+        event = make_event(image=image_upload('first.jpg', 900))
+        old_files = self.variant_files(event)
+        self.assertEqual(event.image_widths, [400, 800, 900])
+
+        event.image = image_upload('second.jpg', 500)
+        event.save()
+        storage = event.image.storage
+        self.assertFalse(any(storage.exists(name) for name in old_files))
+        self.assertEqual(event.image_widths, [400, 500])
+        self.assertEqual(len(self.variant_files(event)), 2 * len(VARIANT_FORMATS))
+
+
+class MediaServeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(
+            MEDIA_ROOT=media_root, MEDIA_SERVE_MODE='sendfile', MEDIA_PROTECTED_PREFIXES=['private/'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        for path in ('docs/manifesto.txt', 'private/export.txt', 'docs/.hidden'):
+            os.makedirs(os.path.join(media_root, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(media_root, path), 'wb') as f:
+                f.write(b'0123456789')
+
+    def get(self, path, user=None, **headers):
+        request = RequestFactory().get(f'/media/{path}', headers=headers)
+        request.user = user or AnonymousUser()
+        return serve_media(request, path)
+
+    def staff(self, **kwargs):
+        return User.objects.create_user('staff', password='x', is_staff=True, **kwargs)
+
+    def test_whole_file(self):
+        response = self.get('docs/manifesto.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_range(self):
+        response = self.get('docs/manifesto.txt', Range='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+
+    def test_unsatisfiable_range(self):
+        response = self.get('docs/manifesto.txt', Range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_traversal_hidden_and_missing_paths_are_404(self):
+        for path in ('../outside.txt', 'docs/../../outside.txt', 'docs/.hidden', 'docs/missing.txt'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+    def test_protected_files_are_staff_only(self):
+        with self.assertRaises(PermissionDenied):
+            self.get('private/export.txt')
+        with self.assertRaises(PermissionDenied):
+            self.get('private/export.txt', self.staff(is_active=False))
+
+    def test_staff_get_protected_files_uncached(self):
+        staff = self.staff()
+        response = self.get('private/export.txt', staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertRaises(Http404):
+            self.get('private/missing.txt', staff)
+
+    @override_settings(MEDIA_SERVE_MODE='accel')
+    def test_accel_mode_hands_the_file_to_nginx(self):
+        response = self.get('docs/manifesto.txt')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/docs/manifesto.txt')
+        self.assertEqual(response.content, b'')
+
+
+class ConditionalDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.event = make_event()
+        self.url = f'/events/{self.event.slug}/'
+
+    def test_matching_etag_gets_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        revalidated = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_saving_the_row_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.event.save()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_deploy_changes_the_etag_and_last_modified(self):
+        response = self.client.get(self.url)
+        bump_site_version()
+        headers = {'If-None-Match': response['ETag']}
+        self.assertEqual(self.client.get(self.url, headers=headers).status_code, 200)
+        # Last-Modified has one-second resolution; deploy a minute later.
+        cache.set(SITE_VERSION_KEY, time.time_ns() + 60 * 10**9, timeout=None)
+        headers = {'If-Modified-Since': response['Last-Modified']}
+        self.assertEqual(self.client.get(self.url, headers=headers).status_code, 200)
+
+
+class AsyncRenderTests(TestCase):
+    async def test_async_views_render_off_the_event_loop(self):
+        on_loop = []
+
+        def render(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return original(*args, **kwargs)
+
+        original = views.render
+        with mock.patch.object(views, 'render', render):
+            for path in ('/about/', '/events/', '/events/?fragment=1'):
+                response = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(on_loop, [False, False, False])
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(SITEMAP_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        for day in range(1, 6):
+            make_event(f'Rally {day}', date=datetime.date(2025, 1, day))
+
+    def test_sections_split_at_the_page_size(self):
+        with mock.patch.object(SITEMAPS['events'], 'limit', 2):
+            index = self.client.get('/sitemap.xml').content.decode()
+            for page in (1, 2, 3):
+                self.assertIn(f'/sitemap-events-{page}.xml', index)
+            self.assertNotIn('/sitemap-events-4.xml', index)
+            self.assertEqual(self.client.get('/sitemap-events-3.xml').content.decode().count('<url>'), 1)
+            self.assertEqual(self.client.get('/sitemap-events-4.xml').status_code, 404)
+        self.assertEqual(self.client.get('/sitemap-nope-1.xml').status_code, 404)
+
+    def test_content_change_rebuilds_only_its_section(self):
+        self.assertNotIn('/events/Fresh/', self.client.get('/sitemap-events-1.xml').content.decode())
+        self.client.get('/sitemap-videos-1.xml')
+        videos = sitemap_cache.section_path('videos', 1)
+        built_at = os.stat(videos).st_mtime_ns
+        with self.captureOnCommitCallbacks(execute=True):
+            make_event('Fresh')
+        self.assertFalse(os.path.exists(sitemap_cache.index_path()))
+        self.assertIn('/events/Fresh/', self.client.get('/sitemap-events-1.xml').content.decode())
+        self.assertEqual(os.stat(videos).st_mtime_ns, built_at)
+
+    def test_unchanged_files_answer_304(self):
+        for path in ('/sitemap.xml', '/sitemap-events-1.xml'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            for header, value in (('If-None-Match', response['ETag']), ('If-Modified-Since', response['Last-Modified'])):
+                with self.subTest(path=path, header=header):
+                    self.assertEqual(self.client.get(path, headers={header: value}).status_code, 304)
+
+
+class SearchTests(TestCase):
+    def titles(self, query, kind=None):
+        return [result['object'].title for result in search.search(query, kind)]
+
+    def test_bangla_words_match_whole_and_as_prefixes(self):
+        make_event('জনসভা ঢাকা')
+        make_event('Other')
+        self.assertEqual(self.titles('জনসভা'), ['জনসভা ঢাকা'])
+        self.assertEqual(self.titles('জনস'), ['জনসভা ঢাকা'])
+
+    def test_english_matches_any_field_case_insensitively(self):
+        make_event('Rally', description='Campaign launch')
+        PressRelease.objects.create(
+            title='Statement', date=datetime.date(2025, 1, 1), category='Campaign', summary='s', content='c',
+        )
+        self.assertEqual(sorted(self.titles('CAMPAIGN')), ['Rally', 'Statement'])
+        self.assertEqual(self.titles('campaign', 'press'), ['Statement'])
+        self.assertEqual(self.titles('campaign launch'), ['Rally'])
+
+    def test_title_matches_rank_first(self):
+        make_event('Budget speech', description='Text')
+        make_event('Town hall', description='Budget talk and budget questions')
+        self.assertEqual(self.titles('budget'), ['Budget speech', 'Town hall'])
+
+    def test_index_follows_saves_and_deletes(self):
+        event = make_event('Rally')
+        event.title = 'Meeting'
+        event.save()
+        self.assertEqual(self.titles('rally'), [])
+        self.assertEqual(self.titles('meeting'), ['Meeting'])
+        event.delete()
+        self.assertEqual(self.titles('meeting'), [])
+
+    def test_admin_changelist_searches_the_index(self):
+        make_event('Rally', description='Dhaka')
+        make_event('Meeting')
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.get('/admin/core/event/', {'q': 'rally'})
+        self.assertEqual([event.title for event in response.context['cl'].result_list], ['Rally'])
+        with mock.patch.object(search, 'matching_ids', wraps=search.matching_ids) as matching:
+            self.client.get('/admin/core/event/', {'q': 'dhaka'})
+        matching.assert_called_once_with('event', 'dhaka')
+
+
+def make_contact(name, is_read=False):
+    return ContactMessage.objects.create(
+        name=name, email='voter@example.com', phone='01700000000', upazila='lohagara',
+        union='padua', department='general', message='Hello', is_read=is_read,
+    )
+
+
+class AdminExportTests(TestCase):
+    SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        self.unread = [make_contact('=HYPERLINK("http://evil")'), make_contact('Unread')]
+        make_contact('Read', is_read=True)
+
+    def export(self, action):
+        # "Select all" on the changelist filtered to unread messages.
+        response = self.client.post('/admin/core/contactmessage/?is_read__exact=0', {
+            'action': action, 'select_across': '1', 'index': '0', '_selected_action': [self.unread[0].pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        return b''.join(response.streaming_content)
+
+    def test_csv_follows_the_filter_and_escapes_formulas(self):
+        rows = list(csv.reader(self.export('export_csv').decode('utf-8-sig').splitlines()))
+        names = sorted(row[1] for row in rows[1:])
+        self.assertEqual(names, ["'=HYPERLINK(\"http://evil\")", 'Unread'])
+
+    def test_xlsx_is_a_valid_workbook_of_the_filtered_rows(self):
+        archive = zipfile.ZipFile(BytesIO(self.export('export_xlsx')))
+        self.assertIsNone(archive.testzip())
+        parts = {name: ElementTree.fromstring(archive.read(name)) for name in archive.namelist()}
+        for override in parts['[Content_Types].xml']:
+            if 'PartName' in override.attrib:
+                self.assertIn(override.attrib['PartName'].lstrip('/'), parts)
+
+        sheet = parts['xl/worksheets/sheet1.xml']
+        rows = sheet.findall(f'{self.SHEET_NS}sheetData/{self.SHEET_NS}row')
+        names = sorted(row[1].findtext(f'{self.SHEET_NS}is/{self.SHEET_NS}t') for row in rows[1:])
+        self.assertEqual(names, ['=HYPERLINK("http://evil")', 'Unread'])
+        # Text is stored as inline strings, never as a formula.
+        self.assertEqual(sheet.findall(f'.//{self.SHEET_NS}f'), [])
+
+
+class MarkAllReadTests(TestCase):
+    URL = '/admin/core/contactmessage/mark-all-read/'
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def test_updates_what_the_filter_and_search_match_in_one_query(self):
+        target = make_contact('Target')
+        make_contact('Other')
+        other_department = make_contact('Target')
+        other_department.department = 'media'
+        other_department.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'{self.URL}?department__exact=general&q=Target')
+        self.assertRedirects(
+            response, '/admin/core/contactmessage/?department__exact=general&q=Target', fetch_redirect_response=False,
+        )
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_contactmessage"')]
+        self.assertEqual(len(updates), 1)
+        read = set(ContactMessage.objects.filter(is_read=True).values_list('pk', flat=True))
+        self.assertEqual(read, {target.pk})
+
+    def test_get_is_not_allowed(self):
+        self.assertEqual(self.client.get(self.URL).status_code, 405)
+
+    def test_view_only_staff_are_forbidden(self):
+        user = User.objects.create_user('viewer', password='x', is_staff=True)
+        user.user_permissions.add(Permission.objects.get(codename='view_contactmessage'))
+        self.client.force_login(user)
+        make_contact('Unread')
+        self.assertEqual(self.client.post(self.URL).status_code, 403)
+        self.assertFalse(ContactMessage.objects.filter(is_read=True).exists())
+
+    def test_invalid_lookup_redirects_to_the_changelist(self):
+        make_contact('Unread')
+        response = self.client.post(f'{self.URL}?is_read__exact=maybe')
+        self.assertRedirects(response, '/admin/core/contactmessage/', fetch_redirect_response=False)
+        self.assertFalse(ContactMessage.objects.filter(is_read=True).exists())
+
+
+class SpoolFlushTests(TestCase):
+    def setUp(self):
+        spool = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool)
+        override = override_settings(SUBMISSION_SPOOL_DIR=spool, SUBMISSION_INGEST_MODE='spool')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def spool_comment(self, **data):
+        form = CommentForm({
+            'name': 'Voter', 'email': 'voter@example.com', 'category': 'general', 'message': 'Hello', **data,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        ingest.submit(form)
+
+    def test_flush_inserts_and_empties_the_spool(self):
+        self.spool_comment()
+        self.spool_comment(name='Second')
+        self.assertEqual(ingest.flush_all(), {'contact': 0, 'comment': 2})
+        self.assertEqual(Comment.objects.count(), 2)
+        stats = ingest.queue_stats()
+        self.assertEqual(stats['queues']['comment']['depth'], 0)
+        self.assertEqual(stats['flush']['rows']['comment'], 2)
+
+    def test_rejected_row_is_moved_aside_and_the_rest_inserted(self):
+        self.spool_comment()
+        self.spool_comment(name='Broken')
+        # A row the database rejects (NOT NULL) instead of a valid submission.
+        path = os.path.join(settings.SUBMISSION_SPOOL_DIR, 'comment', ingest._pending('comment')[-1])
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        payload['data']['name'] = None
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+        with self.assertLogs('core.ingest', 'WARNING'):
+            self.assertEqual(ingest.flush('comment'), 1)
+        self.assertEqual(Comment.objects.get().name, 'Voter')
+        stats = ingest.queue_stats()
+        self.assertEqual(stats['queues']['comment']['depth'], 0)
+        self.assertEqual(stats['failed'], 1)
+
+
+class PooledCaptchaForm(forms.Form):
+    captcha = pooled_captcha_field()
+
+
+class CaptchaPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_opted_in_form_renders_a_pooled_challenge(self):
+        captcha_pool.refill(3)
+        pooled = CaptchaStore.objects.count()
+        form = PooledCaptchaForm()
+        form.as_p()
+        key = form['captcha'].field.widget._key
+        self.assertIsNotNone(captcha_pool.image(key))
+        self.assertEqual(CaptchaStore.objects.count(), pooled)
+
+    def test_pooled_challenge_needs_its_answer(self):
+        captcha_pool.refill(1)
+        key = captcha_pool.pick()
+        self.assertFalse(PooledCaptchaForm({'captcha_0': key, 'captcha_1': 'wrong'}).is_valid())
+        answer = CaptchaStore.objects.get(hashkey=key).response
+        self.assertTrue(PooledCaptchaForm({'captcha_0': key, 'captcha_1': answer}).is_valid())
+
+    def test_public_forms_do_not_require_a_captcha(self):
+        self.assertNotIn('captcha', ContactForm.base_fields)
+        self.assertNotIn('captcha', CommentForm.base_fields)
+
+    def test_lost_head_counter_restarts_at_the_live_batch(self):
+        captcha_pool.refill(2)
+        cache.delete('captcha-pool:head')
+        keys = {captcha_pool.pick(), captcha_pool.pick()}
+        self.assertTrue(all(captcha_pool.image(key) for key in keys))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_deploy_retires_cached_cards(self):
+        event = make_event('Old title')
+        card = get_template('includes/event_card.html')
+        card.render({'event': event, 'site_version': site_version()})
+        # Unchanged row and deploy: the cached markup is served.
+        event.title = 'New title'
+        self.assertIn('Old title', card.render({'event': event, 'site_version': site_version()}))
+        bump_site_version()
+        self.assertIn('New title', card.render({'event': event, 'site_version': site_version()}))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = db_router.ReplicaRouter()
+
+    def test_recent_write_check_is_made_once_per_scope(self):
+        with mock.patch.object(db_router, '_recent_content_write', return_value=False) as check:
+            with db_router.replica_reads():
+                routes = {self.router.db_for_read(Event) for _ in range(3)}
+        self.assertEqual(routes, {'replica'})
+        check.assert_called_once()
+
+    def test_recent_content_write_keeps_reads_on_the_primary(self):
+        db_router.note_content_write()
+        with db_router.replica_reads():
+            self.assertEqual(self.router.db_for_read(Event), 'default')
+
+    def test_reads_outside_a_replica_scope_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+
+
+@override_settings(RATELIMIT_RULES=[('contact', '/contact/', ('POST',), '1/m', 2)])
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post_contact(self, times):
+        with mock.patch.object(views, 'ContactForm', wraps=views.ContactForm) as form:
+            responses = [self.client.post('/contact/', {}) for _ in range(times)]
+        return responses, form.call_count
+
+    def test_over_limit_is_rejected_before_the_form_is_parsed(self):
+        for backend in ('local', 'cache'):
+            with self.subTest(backend=backend), override_settings(RATELIMIT_BACKEND=backend):
+                cache.clear()
+                self.client = self.client_class()
+                responses, parsed = self.post_contact(3)
+                self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+                self.assertEqual(responses[-1]['Retry-After'], '60')
+                self.assertEqual(parsed, 2)
+
+    def test_other_paths_and_methods_are_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/contact/').status_code, 200)
+
+    def test_locmem_cache_uses_get_and_set(self):
+        backend = ratelimit.CacheBackend()
+        rule = ratelimit.Rule('contact', '/contact/', ('POST',), '1/m', 1)
+        self.assertIsNone(backend._redis_client('ratelimit:contact:1.2.3.4'))
+        self.assertEqual(backend.hit('ratelimit:contact:1.2.3.4', rule), (True, 0.0))
+        allowed, retry_after = backend.hit('ratelimit:contact:1.2.3.4', rule)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 60, delta=1)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/15'},
+    })
+    def test_redis_cache_runs_the_atomic_script(self):
+        backend = ratelimit.CacheBackend()
+        rule = ratelimit.Rule('contact', '/contact/', ('POST',), '1/m', 1)
+        self.assertIsNotNone(backend._redis_client('ratelimit:contact:1.2.3.4'))
+        with mock.patch('redis.Redis.eval', return_value=[0, 1500000]) as evaluate:
+            self.assertEqual(backend.hit('ratelimit:contact:1.2.3.4', rule), (False, 1.5))
+        script, keys, key, interval, tolerance = evaluate.call_args.args
+        self.assertIs(script, ratelimit.GCRA_SCRIPT)
+        self.assertEqual((keys, interval, tolerance), (1, 60 * 10**6, 0))
+
+
+class MetricsSnapshotTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(METRICS_DIR=self.directory, METRICS_FLUSH_INTERVAL=3600)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_snapshot(self, name, count):
+        entries = [['http_requests_total', [['view', 'home']], count]]
+        with open(os.path.join(self.directory, f'{name}.json'), 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+
+    def requests_total(self):
+        return metrics.collect().get(('http_requests_total', (('view', 'home'),)), 0)
+
+    def test_dead_workers_are_folded_into_retired_totals(self):
+        self.write_snapshot('100', 1)  # from before the lock files
+        self.write_snapshot('200-dead', 2)
+        open(os.path.join(self.directory, '200-dead.lock'), 'w').close()
+        self.write_snapshot('300-live', 4)
+        live = metrics._try_lock(os.path.join(self.directory, '300-live.lock'))
+        self.addCleanup(os.close, live)
+
+        registry = metrics.Registry()
+        registry.start()
+        self.addCleanup(setattr, registry, 'pid', None)
+        registry.inc('http_requests_total', (('view', 'home'),))
+        registry.flush()
+
+        files = set(os.listdir(self.directory))
+        self.assertNotIn('100.json', files)
+        self.assertNotIn('200-dead.json', files)
+        self.assertIn('300-live.json', files)
+        self.assertIn(f'{registry.name}.json', files)
+        self.assertEqual(self.requests_total(), 8)
+        # Folding again (another worker starting) changes nothing.
+        metrics.retire_dead_workers(self.directory)
+        self.assertEqual(self.requests_total(), 8)
+
+    def test_requests_do_not_write_snapshots(self):
+        with mock.patch.object(metrics.Registry, 'flush') as flush:
+            self.client.get('/')
+        flush.assert_not_called()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    PAGE_CACHE_ENABLED=False,
+)
+class QueryBudgetTests(TestCase):
+    """Public pages stay within their budgets with several rows per list."""
+
+    def setUp(self):
+        for day in range(1, 4):
+            make_event(f'Campaign rally {day}', date=datetime.date(2025, 1, day))
+            PressRelease.objects.create(
+                title=f'Campaign statement {day}', date=datetime.date(2025, 1, day),
+                category='Campaign', summary='Summary', content='Content',
+            )
+            Video.objects.create(title=f'Campaign video {day}', youtube_url=f'https://www.youtube.com/watch?v={day:011d}')
+            Comment.objects.create(
+                name='Voter', email='voter@example.com', upazila='lohagara', category='general',
+                message='Hi', rating=day, is_published=True,
+            )
+
+    def assertWithinBudget(self, path):
+        with self.subTest(path=path):
+            response, problems = check_request(self.client, path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(problems, [])
+
+    def test_listings_and_feeds(self):
+        for path in ('/', '/events/', '/press/', '/videos/', '/comments/published/', '/search/?q=campaign'):
+            self.assertWithinBudget(path)
+
+    def test_detail_pages(self):
+        for model, prefix in ((Event, '/events/'), (PressRelease, '/press/'), (Video, '/videos/')):
+            self.assertWithinBudget(f'{prefix}{model.objects.first().slug}/')
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling._config.update(value=None, expires=0.0)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(PROFILER_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def profiles(self):
+        return [name for name in os.listdir(settings.PROFILER_DIR) if name.endswith('.folded')]
+
+    def test_off_by_default(self):
+        response = self.client.get('/about/')
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(self.profiles(), [])
+
+    def test_valid_token_profiles_the_request(self):
+        response = self.client.get('/about/', headers={'X-Profile': profiling.make_token()})
+        self.assertEqual(self.profiles(), [response['X-Profile-File']])
+        self.assertTrue(response['X-Profile-File'].endswith('-about.folded'))
+
+    def test_forged_and_expired_tokens_are_ignored(self):
+        forged = profiling.make_token()[:-1] + 'x'
+        with mock.patch('time.time', return_value=time.time() - 2 * settings.PROFILER_TOKEN_MAX_AGE):
+            expired = profiling.make_token()
+        other_salt = signing.TimestampSigner(salt='elsewhere').sign(profiling.TOKEN_VALUE)
+        for token in (forged, expired, other_salt):
+            with self.subTest(token=token):
+                response = self.client.get('/about/', headers={'X-Profile': token})
+                self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(self.profiles(), [])
+
+    def test_runtime_switch_samples_the_chosen_views_until_disabled(self):
+        profiling.enable(1.0, views=['about'])
+        self.client.get('/about/')
+        self.client.get('/manifesto/')
+        self.assertEqual(len(self.profiles()), 1)
+        self.assertTrue(self.profiles()[0].endswith('-about.folded'))
+
+        profiling.disable()
+        profiling._config.update(expires=0.0)  # the next config refresh
+        self.client.get('/about/')
+        self.assertEqual(len(self.profiles()), 1)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        for day in range(1, 4):
+            make_event(f'Event {day}', date=datetime.date(2025, 1, day))
+            Comment.objects.create(name='Voter', email='voter@example.com', category='general', message='Hi')
+        problems = {name: found for name, (_, found) in check_plans().items() if found}
+        self.assertEqual(problems, {})
+
+
+class RatingSummaryTests(TestCase):
+    def make_comments(self, ratings):
+        return [
+            Comment.objects.create(
+                name='Voter', email='voter@example.com', upazila='lohagara', category='general',
+                message='Hi', rating=rating,
+            )
+            for rating in ratings
+        ]
+
+    def test_publishing_twice_counts_each_comment_once(self):
+        self.make_comments([5, 4, None])
+        comments = Comment.objects.all()
+        self.assertEqual(ratings.set_published(comments, True), 3)
+        self.assertEqual(ratings.set_published(comments, True), 0)
+        overall = ratings.statistics()['overall']
+        self.assertEqual((overall['count'], overall['rated_count'], overall['mean']), (3, 2, 4.5))
+
+    def test_totals_match_a_rebuild(self):
+        comments = self.make_comments([1, 2, 3, 4, 5])
+        ratings.set_published(Comment.objects.all(), True)
+        comments[0].rating = 5
+        comments[0].save()
+        ratings.set_published(Comment.objects.filter(pk=comments[1].pk), False)
+        incremental = ratings.statistics()
+        ratings.rebuild()
+        self.assertEqual(ratings.statistics(), incremental)
+
+
+class SlugAllocationTests(TestCase):
+    def test_free_base_is_used_even_when_numbered_slugs_exist(self):
+        make_event(slug='Rally-2')
+        self.assertEqual(make_event('Rally').slug, 'Rally')
+
+    def test_taken_base_gets_the_next_number(self):
+        make_event(slug='Rally')
+        make_event(slug='Rally-2')
+        self.assertEqual(make_event('Rally').slug, 'Rally-3')
+        self.assertEqual(make_event('Rally').slug, 'Rally-4')
+
+    def test_batch_allocation_never_repeats_a_slug(self):
+        make_event(slug='Rally-1')
+        allocator = SlugAllocator(Event)
+        self.assertEqual([allocator.allocate('Rally') for _ in range(3)], ['Rally', 'Rally-2', 'Rally-3'])
+
+    def test_bangla_titles_keep_their_letters(self):
+        self.assertEqual(make_event('জনসভা ঢাকা').slug, 'জনসভা-ঢাকা')
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from . import views
 
 urlpatterns = [
@@ -12,8 +12,15 @@ urlpatterns = [
     path('about/', views.about, name='about'),
     path('manifesto/', views.manifesto, name='manifesto'),
     path('news-media/', views.news_media, name='news_media'),
+    path('search/', views.search, name='search'),
     path('contact/', views.contact, name='contact'),
     path('comments/', views.comments, name='comments'),
+    path('comments/published/', views.comment_feed, name='comment_feed'),
+    path('internal/db-stats/', views.db_stats, name='db_stats'),
+    path('metrics', views.prometheus_metrics, name='metrics'),
+    # Same paths and names as captcha.urls, served from the pre-rendered pool.
+    re_path(r'^captcha/image/(?P<key>\w+)/$', views.captcha_image, name='captcha-image', kwargs={'scale': 1}),
+    re_path(r'^captcha/refresh/$', views.captcha_refresh, name='captcha-refresh'),
     path('captcha/', include('captcha.urls')),
 ]
 
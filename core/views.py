@@ -1,69 +1,219 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import datetime
+import json
+import os
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from captcha import views as captcha_views
+from captcha.conf import settings as captcha_settings
+from captcha.helpers import captcha_audio_url, captcha_image_url
+from django.conf import settings
+from django.shortcuts import aget_object_or_404, render, redirect
 from django.contrib import messages
-from .models import Event, PressRelease, Video
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from . import captcha_pool, ingest, metrics, ratings
+from . import search as search_index
+from . import sitemap_cache
+from .cache import cache_page_for, site_version
+from .db_router import use_replica
+from .dbstats import connection_stats
+from .models import Comment, Event, PressRelease, SearchDocument, Video
 from .forms import ContactForm, CommentForm
+from .pagination import apaginate_keyset
+from .query_budget import query_budget
+
+
+async def arender(request, template_name, context=None, **kwargs):
+    """
+    ``render()`` for async views, run in the request's sync thread.
+
+    Rendering reads the cache (``{% cache %}`` fragments, the site version),
+    which with Redis is a blocking network call; on the event loop it would
+    stall every other request of the worker.
+    """
+    return await sync_to_async(render)(request, template_name, context, **kwargs)
+
+async def render_listing(request, template_name, fragment_template_name, context):
+    """
+    Render a keyset-paginated listing page.
+
+    ``?fragment=1`` returns only the cards and the next "load more" link so
+    the page can append further results without a full reload.
+    """
+    if request.GET.get('fragment'):
+        template_name = fragment_template_name
+    return await arender(request, template_name, context)
+
+def conditional_on_updated_at(model):
+    """
+    Answer conditional GETs for a slug-addressed detail page with 304.
+
+    The ETag and Last-Modified both come from a single lookup on the
+    unique slug index, made before the view runs, so a revalidation never
+    renders the template. Both also move with site_version(), so browsers
+    drop pages rendered by templates from before a deploy. Unknown slugs
+    fall through to the view's 404.
+    """
+    def freshness(request, slug):
+        if not hasattr(request, '_freshness'):
+            row = model.objects.filter(slug=slug).values_list('pk', 'updated_at').first()
+            request._freshness = row and (*row, site_version())
+        return request._freshness
+
+    def etag(request, slug):
+        row = freshness(request, slug)
+        if row:
+            pk, updated_at, version = row
+            return f'{model._meta.model_name}-{pk}-{updated_at.timestamp():.6f}-{version}'
 
-def home(request):
+    def last_modified(request, slug):
+        row = freshness(request, slug)
+        if row:
+            _, updated_at, version = row
+            if version is None:
+                return updated_at  # a cache that keeps nothing (DummyCache)
+            # The site version is the time_ns() of the last deploy.
+            deployed_at = datetime.datetime.fromtimestamp(version / 1e9, datetime.timezone.utc)
+            return max(updated_at, deployed_at)
+
+    def decorator(view_func):
+        # no-cache: browsers keep the page but revalidate on every visit.
+        conditional = cache_control(no_cache=True)(
+            condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+        )
+        if not iscoroutinefunction(view_func):
+            return conditional
+
+        # condition() calls etag/last_modified synchronously, so an async
+        # view looks the row and site version up first and they read them
+        # from the request.
+        @wraps(view_func)
+        async def async_wrapper(request, slug):
+            row = await model.objects.filter(slug=slug).values_list('pk', 'updated_at').afirst()
+            request._freshness = row and (*row, await sync_to_async(site_version)())
+            return await conditional(request, slug)
+        return async_wrapper
+    return decorator
+
+@use_replica
+@cache_page_for(Event, Video, PressRelease)
+@query_budget(3)
+async def home(request):
     """Home page with latest 3 events, 6 videos, and 3 press releases"""
-    events = Event.objects.all()[:3]
-    videos = Video.objects.all()[:6]
-    press_releases = PressRelease.objects.all()[:3]
-    return render(request, 'home.html', {
+    events = [event async for event in Event.objects.all()[:3]]
+    videos = [video async for video in Video.objects.all()[:6]]
+    press_releases = [press async for press in PressRelease.objects.all()[:3]]
+    return await arender(request, 'home.html', {
         'events': events,
         'videos': videos,
         'press_releases': press_releases
     })
 
-def events(request):
+@use_replica
+@cache_page_for(Event)
+@query_budget(1)
+async def events(request):
     """Events listing page"""
-    events = Event.objects.all()
-    return render(request, 'events.html', {'events': events})
+    page = await apaginate_keyset(Event.objects.all(), 'date', request.GET.get('after'))
+    return await render_listing(request, 'events.html', 'includes/event_list_page.html', {
+        'events': page.object_list,
+        'page': page,
+    })
 
-def event_detail(request, slug):
+@use_replica
+@conditional_on_updated_at(Event)
+@query_budget(2)
+async def event_detail(request, slug):
     """Individual event detail page"""
-    event = get_object_or_404(Event, slug=slug)
-    return render(request, 'event_detail.html', {'event': event})
+    event = await aget_object_or_404(Event, slug=slug)
+    return await arender(request, 'event_detail.html', {'event': event})
 
-def about(request):
+@query_budget(0)
+async def about(request):
     """About page"""
-    return render(request, 'about.html')
+    return await arender(request, 'about.html')
 
-def manifesto(request):
+@query_budget(0)
+async def manifesto(request):
     """Manifesto page"""
-    return render(request, 'manifesto.html')
+    return await arender(request, 'manifesto.html')
 
-def news_media(request):
+@use_replica
+@cache_page_for(PressRelease, Video)
+@query_budget(2)
+async def news_media(request):
     """News media page with latest press releases and videos"""
-    press_releases = PressRelease.objects.all()[:3]
-    videos = Video.objects.all()[:3]
-    return render(request, 'news_media.html', {'press_releases': press_releases, 'videos': videos})
+    press_releases = [press async for press in PressRelease.objects.all()[:3]]
+    videos = [video async for video in Video.objects.all()[:3]]
+    return await arender(request, 'news_media.html', {'press_releases': press_releases, 'videos': videos})
 
-def press_releases(request):
+@use_replica
+@cache_page_for(PressRelease)
+@query_budget(1)
+async def press_releases(request):
     """Press releases listing page"""
-    press_releases = PressRelease.objects.all()
-    return render(request, 'press_releases.html', {'press_releases': press_releases})
+    page = await apaginate_keyset(PressRelease.objects.all(), 'date', request.GET.get('after'))
+    return await render_listing(request, 'press_releases.html', 'includes/press_list_page.html', {
+        'press_releases': page.object_list,
+        'page': page,
+    })
 
-def press_release_detail(request, slug):
+@use_replica
+@conditional_on_updated_at(PressRelease)
+@query_budget(2)
+async def press_release_detail(request, slug):
     """Individual press release detail page"""
-    press = get_object_or_404(PressRelease, slug=slug)
-    return render(request, 'press_release_detail.html', {'press': press})
+    press = await aget_object_or_404(PressRelease, slug=slug)
+    return await arender(request, 'press_release_detail.html', {'press': press})
 
-def videos(request):
+@use_replica
+@cache_page_for(Video)
+@query_budget(1)
+async def videos(request):
     """Videos listing page"""
-    videos = Video.objects.all()
-    return render(request, 'videos.html', {'videos': videos})
+    page = await apaginate_keyset(Video.objects.all(), 'created_at', request.GET.get('after'))
+    return await render_listing(request, 'videos.html', 'includes/video_list_page.html', {
+        'videos': page.object_list,
+        'page': page,
+    })
 
-def video_detail(request, slug):
+@use_replica
+@conditional_on_updated_at(Video)
+@query_budget(2)
+async def video_detail(request, slug):
     """Individual video detail page"""
-    video = get_object_or_404(Video, slug=slug)
-    return render(request, 'video_detail.html', {'video': video})
+    video = await aget_object_or_404(Video, slug=slug)
+    return await arender(request, 'video_detail.html', {'video': video})
+
+@use_replica
+@query_budget(4)
+async def search(request):
+    """Full-text search across events, press releases and videos"""
+    query = request.GET.get('q', '').strip()[:200]
+    kind = request.GET.get('type', '')
+    if kind not in search_index.SOURCES:
+        kind = ''
+    results = await search_index.asearch(query, kind or None) if query else []
+    return await arender(request, 'search.html', {
+        'query': query,
+        'kind': kind,
+        'kinds': SearchDocument.KIND_CHOICES,
+        'results': results,
+    })
 
 
+@query_budget(1)
 def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            form.save()
+            ingest.submit(form)
             messages.success(request, 'আপনার বার্তা সফলভাবে প্রেরণ করা হয়েছে। আমরা শীঘ্রই আপনার সাথে যোগাযোগ করব।')
             return redirect('contact')
         else:
@@ -74,12 +224,13 @@ def contact(request):
     return render(request, 'contact.html', {'form': form})
 
 
+@query_budget(1)
 def comments(request):
     """Comments/Feedback page for user opinions"""
     if request.method == 'POST':
         form = CommentForm(request.POST)
         if form.is_valid():
-            form.save()
+            ingest.submit(form)
             messages.success(request, 'আপনার মতামত সফলভাবে জমা হয়েছে। আপনার মূল্যবান মতামতের জন্য ধন্যবাদ।')
             return redirect('comments')
         else:
@@ -89,6 +240,41 @@ def comments(request):
     
     return render(request, 'comments.html', {'form': form})
 
+@require_safe
+def captcha_image(request, key, scale=1):
+    """Serve a pre-rendered captcha from the pool, drawing it only on a miss"""
+    pooled = captcha_pool.image(key)
+    if pooled is None:
+        return captcha_views.captcha_image(request, key, scale=scale)
+    content_type, content = pooled
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Length'] = len(content)
+    return response
+
+
+def captcha_refresh(request):
+    """Hand out a new pooled captcha for the widget's ajax refresh"""
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        raise Http404
+    key = captcha_pool.pick()
+    data = {
+        'key': key,
+        'image_url': captcha_image_url(key),
+        'audio_url': captcha_audio_url(key) if captcha_settings.CAPTCHA_FLITE_PATH else None,
+    }
+    return HttpResponse(json.dumps(data), content_type='application/json')
+
+@use_replica
+@cache_page_for(Comment)
+@query_budget(2)
+async def comment_feed(request):
+    """Published comments, newest first, with rating statistics"""
+    page = await apaginate_keyset(Comment.objects.filter(is_published=True), 'created_at', request.GET.get('after'))
+    context = {'comments': page.object_list, 'page': page}
+    if not request.GET.get('fragment'):
+        context['stats'] = await ratings.astatistics()
+    return await render_listing(request, 'comment_feed.html', 'includes/comment_list_page.html', context)
+
 # Custom error handlers
 def custom_404(request, exception):
     return render(request, '404.html', status=404)
@@ -122,3 +308,79 @@ def robots_txt(request):
     ]
     return HttpResponse("\n".join(lines), content_type="text/plain")
 
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+async def serve_sitemap_file(request, path):
+    """Serve a generated sitemap file, answering conditional requests with 304"""
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        # A section file is at most SITEMAP_PAGE_SIZE URLs; read it in a
+        # thread rather than streaming a sync file iterator from the loop.
+        content = await sync_to_async(_read_file, thread_sensitive=False)(path)
+        response = HttpResponse(content, content_type='application/xml')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
+
+@use_replica
+@require_safe
+@query_budget(12)
+async def sitemap_index(request):
+    """Sitemap index listing one file per section page"""
+    return await serve_sitemap_file(request, await sitemap_cache.aensure_index())
+
+@use_replica
+@require_safe
+@query_budget(3)
+async def sitemap_section(request, section, page):
+    """One page of a sitemap section, e.g. /sitemap-events-2.xml"""
+    if section not in sitemap_cache.SITEMAPS:
+        raise Http404('Unknown sitemap section')
+    path = await sitemap_cache.aensure_section(section, page)
+    if path is None:
+        raise Http404('No such sitemap page')
+    return await serve_sitemap_file(request, path)
+
+
+@staff_member_required
+def db_stats(request):
+    """Database connection reuse / pool statistics of the answering worker"""
+    return JsonResponse(connection_stats())
+
+
+def _scrape_gauges():
+    spool = ingest.queue_stats()
+    queues = spool['queues']
+    last_flush = spool['flush'] or {}
+    return [
+        ('ingest_queue_depth', 'Submissions waiting in the spool',
+         [((('kind', kind),), stats['depth']) for kind, stats in queues.items()]),
+        ('ingest_queue_oldest_seconds', 'Age of the oldest spooled submission',
+         [((('kind', kind),), stats['oldest_seconds']) for kind, stats in queues.items()]),
+        ('ingest_failed', 'Spooled submissions moved to failed/', [((), spool['failed'])]),
+        ('ingest_last_flush_seconds', 'Duration of the last flush that inserted rows',
+         [((), last_flush['last_flush_seconds'])] if last_flush else []),
+        ('ingest_last_flush_timestamp_seconds', 'Unix time of the last flush that inserted rows',
+         [((), last_flush['last_flush_at'])] if last_flush else []),
+        ('captcha_pool_depth', 'Pre-rendered captcha challenges ready', [((), captcha_pool.depth())]),
+    ]
+
+
+def prometheus_metrics(request):
+    """Metrics of every worker in Prometheus text format (bearer token or staff only)"""
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not (request.user.is_active and request.user.is_staff):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(metrics.collect(), _scrape_gauges()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
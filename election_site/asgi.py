@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'election_site.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from core.template_warmup import warm_templates  # noqa: E402
+
+    warm_templates()
@@ -16,23 +16,15 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.contrib.sitemaps.views import sitemap
-from core.sitemaps import StaticViewSitemap, EventSitemap, PressReleaseSitemap, VideoSitemap
-
-# Sitemap configuration
-# Dictionary maps sitemap names to sitemap classes
-sitemaps = {
-    'static': StaticViewSitemap,        # Static pages (home, about, etc.)
-    'events': EventSitemap,             # Event detail pages
-    'press': PressReleaseSitemap,       # Press release detail pages
-    'videos': VideoSitemap,             # Video detail pages
-}
+from core.views import sitemap_index, sitemap_section
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
-    # Sitemap URL - accessible at /sitemap.xml
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    # Sitemap index at /sitemap.xml, pointing at pre-generated section files
+    # (sections are defined in core.sitemaps.SITEMAPS)
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:page>.xml', sitemap_section, name='sitemap_section'),
 ]
 
 # Custom error handlers
@@ -53,8 +45,8 @@ urlpatterns += [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    from django.views.static import serve
     from django.urls import re_path
+    from core.media import serve_media
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^media/(?P<path>.*)$', serve_media, name='media'),
     ]
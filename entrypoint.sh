@@ -23,8 +23,17 @@ python manage.py migrate --noinput
 
 # Collect static files in production
 if [ "$DEBUG" = "False" ]; then
+    echo "Checking templates compile..."
+    python manage.py check_templates
+
     echo "Collecting static files..."
     python manage.py collectstatic --noinput
+
+    echo "Building sitemap files..."
+    python manage.py build_sitemaps
+
+    echo "Retiring cached pages rendered by the previous release..."
+    python manage.py bump_site_version
 fi
 
 echo "Starting application server..."
@@ -1,2 +1,36 @@
 // Main JavaScript file
 console.log('Nazmul Mostafa Amin loaded');
+
+// "Load more" buttons on the listing pages: fetch the next keyset page as an
+// HTML fragment and append it instead of navigating away.
+document.addEventListener('click', function (event) {
+    const link = event.target.closest('[data-load-more] a');
+    if (!link) {
+        return;
+    }
+    const container = link.closest('[data-load-more-container]');
+    if (!container) {
+        return;
+    }
+    event.preventDefault();
+
+    const wrapper = link.closest('[data-load-more]');
+    const url = new URL(link.href, window.location.href);
+    url.searchParams.set('fragment', '1');
+    link.classList.add('disabled');
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.text();
+        })
+        .then(function (html) {
+            wrapper.remove();
+            container.insertAdjacentHTML('beforeend', html);
+        })
+        .catch(function () {
+            window.location.href = link.href;
+        });
+});